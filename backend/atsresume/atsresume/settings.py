@@ -207,3 +207,64 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 # STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')  # ✅ Ensure STATIC_ROOT is set
 
+
+# Resume extraction cache (keyed by SHA-256 of the uploaded file)
+EXTRACTION_CACHE_MAX_ENTRIES = int(os.getenv("EXTRACTION_CACHE_MAX_ENTRIES", 256))
+EXTRACTION_CACHE_MAX_BYTES = int(os.getenv("EXTRACTION_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+EXTRACTION_CACHE_TTL_SECONDS = int(os.getenv("EXTRACTION_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+
+# PDF extraction process pool (0 processes extracts inline on the request thread)
+EXTRACTION_POOL_PROCESSES = int(os.getenv("EXTRACTION_POOL_PROCESSES", 2))
+EXTRACTION_PAGES_PER_TASK = int(os.getenv("EXTRACTION_PAGES_PER_TASK", 2))
+EXTRACTION_MAX_PAGES = int(os.getenv("EXTRACTION_MAX_PAGES", 20))
+EXTRACTION_TIMEOUT_SECONDS = float(os.getenv("EXTRACTION_TIMEOUT_SECONDS", 20))
+EXTRACTION_MAX_TASKS_PER_CHILD = int(os.getenv("EXTRACTION_MAX_TASKS_PER_CHILD", 50))
+EXTRACTION_MAX_RSS_MB = int(os.getenv("EXTRACTION_MAX_RSS_MB", 512))
+# "auto" tries pypdfium2 and falls back to pdfplumber for degraded pages
+PDF_EXTRACTOR = os.getenv("PDF_EXTRACTOR", "auto")
+
+# Asynchronous extraction jobs (POST /resume/extract/?async=1)
+EXTRACTION_JOB_WORKERS = int(os.getenv("EXTRACTION_JOB_WORKERS", 1))
+EXTRACTION_JOB_POLL_SECONDS = float(os.getenv("EXTRACTION_JOB_POLL_SECONDS", 1))
+# An events stream ties up a web worker thread, so it closes after this long and the client reconnects
+EXTRACTION_JOB_STREAM_SECONDS = int(os.getenv("EXTRACTION_JOB_STREAM_SECONDS", 5))
+EXTRACTION_JOB_MAX_BYTES = int(os.getenv("EXTRACTION_JOB_MAX_BYTES", 10 * 1024 * 1024))
+
+# Tiered parsing: Gemini is only called for fields the local parser scores below this
+LOCAL_PARSE_CONFIDENCE_THRESHOLD = float(os.getenv("LOCAL_PARSE_CONFIDENCE_THRESHOLD", 0.75))
+LLM_PARSE_TIMEOUT_SECONDS = float(os.getenv("LLM_PARSE_TIMEOUT_SECONDS", 30))
+
+# Gemini client: per-request timeout, overall deadline including retries, optional p95 hedging
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+GEMINI_ATTEMPT_TIMEOUT_SECONDS = float(os.getenv("GEMINI_ATTEMPT_TIMEOUT_SECONDS", 15))
+GEMINI_DEADLINE_SECONDS = float(os.getenv("GEMINI_DEADLINE_SECONDS", 25))
+GEMINI_MAX_ATTEMPTS = int(os.getenv("GEMINI_MAX_ATTEMPTS", 3))
+GEMINI_HEDGE = os.getenv("GEMINI_HEDGE", "0") == "1"
+GEMINI_HEDGE_MIN_SAMPLES = int(os.getenv("GEMINI_HEDGE_MIN_SAMPLES", 20))
+
+# Bulk import (POST /resume/import/ and manage.py import_resumes)
+BULK_IMPORT_WORKERS = int(os.getenv("BULK_IMPORT_WORKERS", os.cpu_count() or 4))
+BULK_IMPORT_LLM_CONCURRENCY = int(os.getenv("BULK_IMPORT_LLM_CONCURRENCY", 2))
+BULK_IMPORT_LLM_TIMEOUT_SECONDS = float(os.getenv("BULK_IMPORT_LLM_TIMEOUT_SECONDS", 300))
+# Resumes packed into one Gemini prompt, and how long a partial batch waits for more
+BULK_IMPORT_LLM_BATCH_SIZE = int(os.getenv("BULK_IMPORT_LLM_BATCH_SIZE", 4))
+BULK_IMPORT_LLM_BATCH_WAIT_SECONDS = float(os.getenv("BULK_IMPORT_LLM_BATCH_WAIT_SECONDS", 0.5))
+BULK_IMPORT_BATCH_SIZE = int(os.getenv("BULK_IMPORT_BATCH_SIZE", 50))
+BULK_IMPORT_MAX_FILES = int(os.getenv("BULK_IMPORT_MAX_FILES", 1000))
+
+# Keyset pagination of GET /resume/retrieve/?user_id=...&limit=...
+RESUME_PAGE_DEFAULT_LIMIT = int(os.getenv("RESUME_PAGE_DEFAULT_LIMIT", 20))
+RESUME_PAGE_MAX_LIMIT = int(os.getenv("RESUME_PAGE_MAX_LIMIT", 100))
+
+# Resized copies of resume photos, by longest edge in pixels, served via /resume/image/<id>/?size=
+RESUME_IMAGE_VARIANT_SIZES = [int(size) for size in os.getenv("RESUME_IMAGE_VARIANT_SIZES", "128,480,1024").split(",")]
+
+# Photos up to this size are stored inline on the resume document instead of in GridFS
+RESUME_IMAGE_INLINE_MAX_BYTES = int(os.getenv("RESUME_IMAGE_INLINE_MAX_BYTES", 32 * 1024))
+
+# Builder autosaves are buffered per resume and written together this often, or once this many resumes are waiting
+RESUME_AUTOSAVE_INTERVAL_SECONDS = float(os.getenv("RESUME_AUTOSAVE_INTERVAL_SECONDS", 2))
+RESUME_AUTOSAVE_MAX_PENDING = int(os.getenv("RESUME_AUTOSAVE_MAX_PENDING", 200))
+
+# Resume version history stores a full snapshot every this many versions and JSON diffs in between
+RESUME_HISTORY_SNAPSHOT_EVERY = int(os.getenv("RESUME_HISTORY_SNAPSHOT_EVERY", 10))
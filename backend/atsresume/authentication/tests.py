@@ -325,6 +325,23 @@ class GoogleLoginViewTests(TestCase):
                 }, format='json')
                 self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    @patch('authentication.views.login_log_collection.insert_one')
+    @patch('authentication.views.user_collection.find_one')
+    @patch('authentication.views.id_token.verify_oauth2_token')
+    def test_google_login_new_user_gets_unique_username(self, mock_verify, mock_find, mock_log):
+        mock_verify.return_value = self.google_data
+        mock_find.return_value = None
+        mock_insert = MagicMock(inserted_id='507f1f77bcf86cd799439011')
+
+        with patch('authentication.views.user_collection.insert_one', return_value=mock_insert) as insert:
+            with patch('authentication.views.jwt.encode', return_value='jwt_token'):
+                response = self.client.post(self.url, {'token': 'valid_google_token'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        username = insert.call_args.args[0]['username']
+        self.assertRegex(username, r'^johndoe\d{4}$')
+        mock_find.assert_any_call({'username': username})
+
     def test_google_login_missing_token(self):
         response = self.client.post(self.url, {}, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -344,9 +344,8 @@ class GoogleLoginView(APIView):
         return user
 
     def _generate_username(self, google_data):
-        first = google_data.get("given_name", "").lower()
-        last = google_data.get("family_name", "").lower()
-        return f"{first}{last}"
+        # Usernames are unique (db_indexes.py), so same-named Google users get a suffix
+        return generate_unique_username(google_data.get("given_name", ""), google_data.get("family_name", ""))
 
     def _generate_access_token(self, user):
         payload = {
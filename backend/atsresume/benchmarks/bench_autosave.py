@@ -0,0 +1,132 @@
+"""
+MongoDB operations for builder autosaves: one find_one + update_one pair per
+save, as ResumeUpdateView.put used to do, against the autosave view: the
+same ownership lookup per save, with the writes coalesced per resume into
+periodic bulk_writes by resume.autosave.
+
+    python -m benchmarks.bench_autosave [--mongo-uri URI | --in-memory] [--resumes N] [--saves S]
+                                        [--gap-ms G] [--interval-ms I]
+
+Each resume is edited by its own thread, one save every ``gap-ms``; the
+time scale is shrunk so a run takes seconds (the defaults match a save
+every 200 ms with the 2 s default flush interval). Counts are round trips
+and update operations sent to MongoDB; the final documents are compared to
+check that no last edit was lost.
+"""
+import argparse
+import os
+import threading
+import time
+
+import pymongo
+from bson import ObjectId
+
+from resume.autosave import AutosaveBuffer
+from resume.patch import merge_patch_update
+
+
+class CountingCollection:
+    def __init__(self, collection):
+        self.collection = collection
+        self.round_trips = 0
+        self.updates = 0
+        self._lock = threading.Lock()
+
+    def _count(self, updates):
+        with self._lock:
+            self.round_trips += 1
+            self.updates += updates
+
+    def find_one(self, *args, **kwargs):
+        self._count(0)
+        return self.collection.find_one(*args, **kwargs)
+
+    def update_one(self, *args, **kwargs):
+        self._count(1)
+        return self.collection.update_one(*args, **kwargs)
+
+    def bulk_write(self, operations, **kwargs):
+        self._count(len(operations))
+        return self.collection.bulk_write(operations, **kwargs)
+
+
+def _edit(resume_id, save):
+    return {"title": f"Draft {save}", "resume_details": {"summary": f"{resume_id} revision {save}"}}
+
+
+def baseline_save(collection, resume_id, patch):
+    if collection.find_one({"_id": resume_id}) is None:
+        return
+    update = merge_patch_update(patch)
+    collection.update_one({"_id": resume_id}, {**update, "$inc": {"version": 1}})
+
+
+def buffered_save(collection, buffer, resume_id, patch):
+    # ResumeAutosaveView checks the resume exists and is the caller's before buffering
+    if collection.find_one({"_id": resume_id, "user_id": None}, {"_id": 1}) is None:
+        return
+    buffer.submit(resume_id, merge_patch_update(patch))
+
+
+def _run(resume_ids, saves, gap, save):
+    def editor(resume_id):
+        for n in range(saves):
+            save(resume_id, _edit(resume_id, n))
+            time.sleep(gap)
+
+    threads = [threading.Thread(target=editor, args=(resume_id,)) for resume_id in resume_ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", default=os.getenv("MONGO_BENCH_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--in-memory", action="store_true", help="use mongomock instead of a MongoDB server")
+    parser.add_argument("--resumes", type=int, default=20, help="resumes being edited at once")
+    parser.add_argument("--saves", type=int, default=50, help="autosaves per resume")
+    parser.add_argument("--gap-ms", type=float, default=10, help="time between saves of one resume")
+    parser.add_argument("--interval-ms", type=float, default=100, help="autosave flush interval")
+    args = parser.parse_args()
+
+    if args.in_memory:
+        import mongomock
+        client = mongomock.MongoClient()
+    else:
+        client = pymongo.MongoClient(args.mongo_uri, serverSelectionTimeoutMS=3000)
+    db = client[f"bench_autosave_{ObjectId()}"]
+    try:
+        resume_ids = [str(ObjectId()) for _ in range(args.resumes)]
+        expected = {resume_id: f"{resume_id} revision {args.saves - 1}" for resume_id in resume_ids}
+        print(f"{args.resumes} resumes x {args.saves} saves, one every {args.gap_ms:g} ms, "
+              f"flush interval {args.interval_ms:g} ms")
+
+        for label in ("find_one + update_one", "coalesced bulk_write"):
+            db.resumes.drop()
+            db.resumes.insert_many([{"_id": resume_id, "title": "", "resume_details": {}, "version": 1}
+                                    for resume_id in resume_ids])
+            collection = CountingCollection(db.resumes)
+            started = time.perf_counter()
+            if label.startswith("find_one"):
+                _run(resume_ids, args.saves, args.gap_ms / 1000,
+                     lambda resume_id, patch: baseline_save(collection, resume_id, patch))
+            else:
+                buffer = AutosaveBuffer(collection, interval=args.interval_ms / 1000, max_pending=args.resumes * 10)
+                _run(resume_ids, args.saves, args.gap_ms / 1000,
+                     lambda resume_id, patch: buffered_save(collection, buffer, resume_id, patch))
+                buffer.flush()  # What atexit does on shutdown
+            seconds = time.perf_counter() - started
+            lost = sum(
+                document["resume_details"].get("summary") != expected[document["_id"]]
+                for document in db.resumes.find({}, {"resume_details": 1})
+            )
+            print(f"{label:<22} {collection.round_trips:>7} round trips {collection.updates:>7} updates "
+                  f"{seconds:>6.2f} s  last edits lost: {lost}")
+    finally:
+        client.drop_database(db.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Streaming DOCX extraction (resume.extraction.extract_docx_text) against the
+python-docx paragraph join it replaced.
+
+    python -m benchmarks.bench_docx [--dir DIR] [--docs N] [--large-jobs J]
+
+Synthetic documents put the contact lines in the page header and the skills
+in a table, as many templates do, so the coverage column shows what the old
+extractor dropped. Peak memory is measured with tracemalloc on one large
+document.
+"""
+import argparse
+import io
+import time
+import tracemalloc
+
+import docx
+
+from resume.extraction import extract_docx_text
+
+from .corpus import load_corpus, make_docx, synthetic_resume_lines
+
+
+def python_docx_text(data):
+    document = docx.Document(io.BytesIO(data))
+    return "\n".join(para.text for para in document.paragraphs).strip()
+
+
+def _rate(func, documents):
+    started = time.perf_counter()
+    texts = [func(data) for _, data in documents]
+    return len(documents) / (time.perf_counter() - started), texts
+
+
+def _peak_kb(func, data):
+    tracemalloc.start()
+    func(data)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", help="directory of real .docx resumes")
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--large-jobs", type=int, default=500, help="experience entries in the large document")
+    args = parser.parse_args()
+
+    if args.dir:
+        documents = load_corpus(args.dir, "docx")
+    else:
+        documents = [
+            (f"{seed}.docx", make_docx(synthetic_resume_lines(seed), header_lines=3, table_columns=4))
+            for seed in range(args.docs)
+        ]
+    large = make_docx(synthetic_resume_lines(0, jobs=args.large_jobs), header_lines=3, table_columns=4)
+
+    print(f"{len(documents)} documents; large document {len(large) / 1024:.0f} KB")
+    for name, func in (("python-docx", python_docx_text), ("lxml iterparse", extract_docx_text)):
+        rate, texts = _rate(func, documents)
+        has_contact = sum("@" in text for text in texts)
+        print(f"{name:<15} {rate:>8.1f} docs/sec  contact found in {has_contact}/{len(texts)}  "
+              f"peak {_peak_kb(func, large):>8.0f} KB on the large document")
+
+
+if __name__ == "__main__":
+    main()
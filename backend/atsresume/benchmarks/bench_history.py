@@ -0,0 +1,98 @@
+"""
+Storage and rebuild time of resume version history (resume.history) against
+saving every version as a full copy, as duplicating through ResumeCreateView
+did.
+
+    python -m benchmarks.bench_history [--mongo-uri URI | --in-memory] [--versions V] [--snapshot-every N]
+
+Each version tailors one synthetic resume for a new job description: a
+rewritten summary, a few keywords moved to the front of the skills, and now
+and then a reordered or dropped experience entry. Sizes are compact JSON
+bytes of what each version stores; rebuild time is the mean over every
+version.
+"""
+import argparse
+import copy
+import json
+import os
+import random
+import time
+
+import pymongo
+from bson import ObjectId
+
+from resume.history import ResumeHistory
+
+
+def base_resume():
+    return {
+        "personal": {"name": "Jordan Lee", "email": "jordan@example.com", "phone": "+1 555 0100"},
+        "summary": "Backend engineer with eight years of experience building data platforms. " * 3,
+        "experience": [
+            {"company": f"Company {i}", "title": "Senior Engineer", "dates": f"201{i} - 201{i + 2}",
+             "bullets": [f"Delivered project {i}.{j}, cutting latency by {10 + j}% for 2M users" for j in range(5)]}
+            for i in range(5)
+        ],
+        "education": [{"school": "State University", "degree": "BSc Computer Science", "year": "2012"}],
+        "projects": [{"name": f"Project {i}", "description": "An open source tool " * 4} for i in range(3)],
+        "skills": ["Python", "Django", "MongoDB", "Kafka", "AWS", "Docker", "Kubernetes", "PostgreSQL", "Redis",
+                   "Terraform", "Go", "React", "CI/CD", "gRPC", "Airflow"],
+    }
+
+
+def tailor(details, job, rng):
+    details = copy.deepcopy(details)
+    details["summary"] = f"Engineer focused on {job} work. " + details["summary"][-150:]
+    keywords = rng.sample(details["skills"], 3)
+    details["skills"] = keywords + [skill for skill in details["skills"] if skill not in keywords]
+    if rng.random() < 0.3:
+        details["experience"].insert(0, details["experience"].pop(rng.randrange(len(details["experience"]))))
+    details["experience"][0]["bullets"][0] = f"Led the {job} initiative end to end"
+    return details
+
+
+def _size(value):
+    return len(json.dumps(value, separators=(",", ":"), default=str))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", default=os.getenv("MONGO_BENCH_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--in-memory", action="store_true", help="use mongomock instead of a MongoDB server")
+    parser.add_argument("--versions", type=int, default=50)
+    parser.add_argument("--snapshot-every", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.in_memory:
+        import mongomock
+        client = mongomock.MongoClient()
+    else:
+        client = pymongo.MongoClient(args.mongo_uri, serverSelectionTimeoutMS=3000)
+    db = client[f"bench_history_{ObjectId()}"]
+    try:
+        rng = random.Random(0)
+        history = ResumeHistory(db.resume_versions, snapshot_every=args.snapshot_every)
+        details, full_copies, saved = base_resume(), 0, []
+        for number in range(1, args.versions + 1):
+            details = tailor(details, f"job {number}", rng)
+            resume = {"_id": "bench", "title": f"Resume for job {number}", "resume_details": details}
+            history.create(resume)
+            full_copies += _size({"title": resume["title"], "resume_details": details})
+            saved.append(details)
+
+        stored = sum(version["size"] for version in history.list("bench"))
+        started = time.perf_counter()
+        for number, details in enumerate(saved, start=1):
+            assert history.get("bench", number)["resume_details"] == details
+        rebuild_ms = (time.perf_counter() - started) * 1000 / len(saved)
+
+        print(f"{args.versions} versions, snapshot every {args.snapshot_every}")
+        print(f"full copies            {full_copies / 1024:>8.1f} KB")
+        print(f"snapshots + diffs      {stored / 1024:>8.1f} KB  ({stored / full_copies:.0%})")
+        print(f"rebuild one version    {rebuild_ms:>8.2f} ms")
+    finally:
+        client.drop_database(db.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+GridFS bytes read per dashboard page view when serving resume photos, with
+the whole-file HttpResponse that ResumeImageView used to return against the
+streamed, immutable response from resume.images.gridfs_response, and the
+size of a phone photo against its generated ?size= variants.
+
+    python -m benchmarks.bench_images [--mongo-uri URI | --in-memory] [--photos N] [--kb K] [--views V]
+
+A page view requests every photo on the dashboard. The "after" client keeps
+a browser-style cache: immutable responses are reused without a request, and
+a forced reload revalidates with If-None-Match. Bytes are counted as GridFS
+chunk data handed back by the driver, plus one files document per request.
+"""
+import argparse
+import io
+import os
+
+import django
+from django.conf import settings
+
+if not settings.configured:
+    settings.configure()
+    django.setup()
+
+import gridfs
+import gridfs.grid_file
+import pymongo
+from bson import ObjectId
+from django.http import HttpResponse
+from django.test import RequestFactory
+from PIL import Image, ImageFilter
+
+from resume.images import generate_variants, gridfs_response
+
+_counts = {"chunk_bytes": 0, "files_reads": 0}
+_next_chunk = gridfs.grid_file._GridOutChunkIterator.next
+
+
+def _counting_next(self):
+    chunk = _next_chunk(self)
+    _counts["chunk_bytes"] += len(chunk["data"])
+    return chunk
+
+
+gridfs.grid_file._GridOutChunkIterator.next = _counting_next
+gridfs.grid_file._GridOutChunkIterator.__next__ = _counting_next
+
+
+def _get(fs, file_id):
+    _counts["files_reads"] += 1
+    return fs.get(file_id)
+
+
+def baseline_view(fs, file_id):
+    # ResumeImageView before streaming: the GridOut is handed to HttpResponse, which reads all of it
+    response = HttpResponse(_get(fs, file_id), content_type="image/png")
+    return response.content
+
+
+def variant_sizes():
+    return [int(size) for size in os.getenv("RESUME_IMAGE_VARIANT_SIZES", "128,480,1024").split(",")]
+
+
+class BrowserCache:
+    def __init__(self):
+        self.entries = {}
+
+    def fetch(self, fs, file_id, reload=False):
+        cached = self.entries.get(file_id)
+        if cached and "immutable" in cached["Cache-Control"] and not reload:
+            return
+        headers = {"HTTP_IF_NONE_MATCH": cached["ETag"]} if cached else {}
+        response = gridfs_response(RequestFactory().get("/", **headers), _get(fs, file_id))
+        if response.status_code == 200:
+            b"".join(response.streaming_content)
+            self.entries[file_id] = response
+
+
+def _measure(run):
+    _counts.update(chunk_bytes=0, files_reads=0)
+    run()
+    return _counts["chunk_bytes"], _counts["files_reads"]
+
+
+def phone_photo(width=3024, height=4032):
+    """A noisy, blurred JPEG that compresses about as badly as a real camera photo"""
+    noise = Image.frombytes("RGB", (width // 4, height // 4), os.urandom(width * height * 3 // 16))
+    image = noise.resize((width, height)).filter(ImageFilter.GaussianBlur(2))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=92)
+    return buffer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", default=os.getenv("MONGO_BENCH_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--in-memory", action="store_true", help="use mongomock instead of a MongoDB server")
+    parser.add_argument("--photos", type=int, default=6, help="resumes with a photo on the dashboard")
+    parser.add_argument("--kb", type=int, default=800, help="size of each stored photo")
+    parser.add_argument("--views", type=int, default=10, help="dashboard page views, the last one a reload")
+    args = parser.parse_args()
+
+    if args.in_memory:
+        import mongomock
+        import mongomock.gridfs
+        mongomock.gridfs.enable_gridfs_integration()
+        client = mongomock.MongoClient()
+    else:
+        client = pymongo.MongoClient(args.mongo_uri, serverSelectionTimeoutMS=3000)
+    db = client[f"bench_images_{ObjectId()}"]
+    fs = gridfs.GridFS(db)
+    try:
+        photo = os.urandom(args.kb * 1024)
+        ids = [fs.put(photo, filename=f"{i}.jpg", content_type="image/jpeg") for i in range(args.photos)]
+
+        def before():
+            for _ in range(args.views):
+                for file_id in ids:
+                    baseline_view(fs, file_id)
+
+        def after():
+            cache = BrowserCache()
+            for view in range(args.views):
+                for file_id in ids:
+                    cache.fetch(fs, file_id, reload=view == args.views - 1)
+
+        print(f"{args.photos} photos of {args.kb} KB, {args.views} page views")
+        for label, run in (("whole-file response", before), ("streamed + immutable", after)):
+            chunk_bytes, files_reads = _measure(run)
+            print(f"{label:<22} {chunk_bytes / args.views / 1024:>10.1f} KB chunks/view "
+                  f"{files_reads / args.views:>6.1f} files reads/view")
+
+        original_id = fs.put(phone_photo(), filename="phone.jpg", content_type="image/jpeg")
+        variants = generate_variants(fs, original_id, variant_sizes())
+        print(f"\nphone photo            {fs.get(original_id).length / 1024:>10.1f} KB")
+        for size, formats in variants.items():
+            for name, variant_id in formats.items():
+                print(f"?size={size:<5} {name:<5}       {fs.get(ObjectId(variant_id)).length / 1024:>10.1f} KB")
+    finally:
+        client.drop_database(db.name)
+
+
+if __name__ == "__main__":
+    main()
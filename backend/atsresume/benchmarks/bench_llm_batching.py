@@ -0,0 +1,51 @@
+"""
+Throughput of batched Gemini parsing (parse_resumes_with_gemini) by batch size,
+against a local fake Gemini server.
+
+    python -m benchmarks.bench_llm_batching [--docs N] [--batch-sizes 1,4,8] [--concurrency C]
+                                            [--overhead S] [--seconds-per-token S]
+
+The fake server charges a fixed overhead per request plus generation time per
+output token, so batching can only save the per-request part; the numbers show
+how much of it a given overhead leaves on the table.
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from resume.utils import parse_resumes_with_gemini
+
+from .corpus import synthetic_resume_lines
+from .fake_gemini import FakeGemini
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=48)
+    parser.add_argument("--batch-sizes", default="1,4,8")
+    parser.add_argument("--concurrency", type=int, default=2, help="batched calls in flight, as in bulk imports")
+    parser.add_argument("--overhead", type=float, default=0.4, help="seconds per request")
+    parser.add_argument("--seconds-per-token", type=float, default=0.0005)
+    args = parser.parse_args()
+
+    texts = ["\n".join(synthetic_resume_lines(seed, jobs=2, tasks_per_job=2)) for seed in range(args.docs)]
+
+    with FakeGemini(args.overhead, args.seconds_per_token) as fake:
+        print(f"{len(texts)} documents, {args.concurrency} calls in flight, "
+              f"{args.overhead}s/request + {args.seconds_per_token}s/output token")
+        for batch_size in [int(size) for size in args.batch_sizes.split(",")]:
+            chunks = [texts[i:i + batch_size * 4] for i in range(0, len(texts), batch_size * 4)]
+            requests_before = fake.requests
+            started = time.perf_counter()
+            with ThreadPoolExecutor(args.concurrency) as pool:
+                results = [r for chunk in pool.map(lambda c: parse_resumes_with_gemini(c, batch_size), chunks)
+                           for r in chunk]
+            elapsed = time.perf_counter() - started
+
+            assert [r["personal"]["name"] for r in results] == [text.split("\n")[0] for text in texts]
+            print(f"batch size {batch_size:>2}: {len(texts) / elapsed * 60:>8.0f} docs/min, "
+                  f"{fake.requests - requests_before} requests")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Throughput of batched parse_resumes() against the per-document parse_resume() loop.
+
+    python -m benchmarks.bench_parse_resumes [--docs N] [--batch-size B] [--n-process P]
+"""
+import argparse
+import time
+
+from resume.nlp import get_nlp
+from resume.utils import parse_resume, parse_resumes
+
+from .corpus import synthetic_resume_lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--n-process", type=int, default=1)
+    args = parser.parse_args()
+
+    texts = ["\n".join(synthetic_resume_lines(seed)) for seed in range(args.docs)]
+    get_nlp()  # Keep model loading out of both timings
+
+    started = time.perf_counter()
+    looped = [parse_resume(text) for text in texts]
+    loop_rate = len(texts) / (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    batched = list(parse_resumes(texts, batch_size=args.batch_size, n_process=args.n_process))
+    batch_rate = len(texts) / (time.perf_counter() - started)
+
+    assert looped == batched, "batched results differ from the per-document loop"
+    print(f"{len(texts)} documents")
+    print(f"parse_resume loop   {loop_rate:>10.1f} docs/sec")
+    print(f"parse_resumes batch {batch_rate:>10.1f} docs/sec "
+          f"(batch_size={args.batch_size}, n_process={args.n_process})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Estimated prompt size of the compiled Gemini prompt against the previous one.
+
+    python -m benchmarks.bench_prompt [--docs N] [--jobs J] [--budget TOKENS]
+
+The previous prompt embedded the schema with json.dumps(indent=5), repeated
+the field list in prose and sent the whole whitespace-collapsed text. The
+synthetic resumes get a running header and page numbers every 45 lines, as
+multi-page PDFs do.
+"""
+import argparse
+import json
+
+from resume.prompt import SCHEMA, compile_prompt, estimate_tokens
+
+from .corpus import synthetic_resume_lines
+
+LEGACY_FIELDS = """
+    Extract the following details from this resume:
+    - Name
+    - Email
+    - Phone Number only in 10 digits
+    - Address
+    - Summary (Ensure it's extracted properly. If missing, return null.)
+    - Skills (as a list)
+    - Experience (Job Title, Company, Start Date, End Date, Location, Description as separate tasks)
+    - Projects (Title, Description as separate tasks, Technologies used)
+    - Education (Institution, Graduation Date, Course, Location)
+
+    Structure it in **valid JSON** format:
+"""
+
+
+def legacy_prompt(text):
+    return f"{LEGACY_FIELDS}    {json.dumps(SCHEMA, indent=5)}\n\n    Resume Text:\n    {' '.join(text.split())}\n"
+
+
+def with_page_artifacts(lines, lines_per_page=45):
+    out = []
+    for page, start in enumerate(range(0, len(lines), lines_per_page), 1):
+        out.append(f"{lines[0]} - Resume - {lines[1]}")
+        out.extend(lines[start:start + lines_per_page])
+        out.append(f"Page {page}")
+    return "\n".join(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=100)
+    parser.add_argument("--jobs", type=int, default=8, help="experience entries per synthetic resume")
+    parser.add_argument("--budget", type=int, default=None, help="token budget (default: GEMINI_PROMPT_TOKEN_BUDGET)")
+    args = parser.parse_args()
+
+    texts = [with_page_artifacts(synthetic_resume_lines(seed, jobs=args.jobs)) for seed in range(args.docs)]
+    legacy = sum(estimate_tokens(legacy_prompt(text)) for text in texts) / len(texts)
+    compiled = [compile_prompt(text, args.budget) for text in texts]
+    tokens = sum(parts.estimated_tokens for parts in compiled) / len(compiled)
+    trimmed = sum(parts.trimmed_lines for parts in compiled) / len(compiled)
+
+    print(f"{len(texts)} documents, estimated input tokens per prompt")
+    print(f"previous prompt  {legacy:>8.0f}")
+    print(f"compiled prompt  {tokens:>8.0f} ({1 - tokens / legacy:.0%} smaller, {trimmed:.1f} lines trimmed/doc)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Per-document cost of the single-pass scanner against the previous field extractors.
+
+    python -m benchmarks.bench_scanner [--docs N] [--jobs J] [--repeat R]
+
+The baseline re-implements the old extract_email / extract_phone /
+extract_sections trio, where each helper re-split or re-scanned the whole text
+and every regex hit went through phonenumbers.parse without a region.
+"""
+import argparse
+import re
+import time
+
+import phonenumbers
+
+from resume.scanner import parse_phone, scan
+
+from .corpus import synthetic_resume_lines
+
+
+def _baseline_email(text):
+    match = re.search(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}", text)
+    return match.group(0) if match else None
+
+
+def _baseline_phone(text):
+    for match in re.findall(r'\+?\d[\d -]{8,15}\d', text):
+        try:
+            phone = phonenumbers.parse(match, None)
+            if phonenumbers.is_valid_number(phone):
+                return phonenumbers.format_number(phone, phonenumbers.PhoneNumberFormat.INTERNATIONAL)
+        except phonenumbers.NumberParseException:
+            continue
+    return None
+
+
+def _baseline_sections(text):
+    sections = {"experience": [], "skills": [], "projects": []}
+    current = None
+    for line in text.split("\n"):
+        lower = line.lower().strip()
+        if "experience" in lower:
+            current = "experience"
+        elif "skills" in lower:
+            current = "skills"
+        elif "projects" in lower:
+            current = "projects"
+        elif current:
+            sections[current].append(line.strip())
+    return sections
+
+
+def baseline(text):
+    return _baseline_email(text), _baseline_phone(text), _baseline_sections(text)
+
+
+def _time_per_doc(func, texts, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text in texts:
+            func(text)
+        best = min(best, time.perf_counter() - started)
+    return best / len(texts) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--jobs", type=int, default=40, help="experience entries per synthetic resume")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    texts = ["\n".join(synthetic_resume_lines(seed, jobs=args.jobs, tasks_per_job=8)) for seed in range(args.docs)]
+    average_kb = sum(len(text) for text in texts) / len(texts) / 1024
+
+    baseline_us = _time_per_doc(baseline, texts, args.repeat)
+    parse_phone.cache_clear()
+    scanner_us = _time_per_doc(scan, texts, args.repeat)
+
+    print(f"{len(texts)} documents, {average_kb:.1f} KB each, best of {args.repeat}")
+    print(f"baseline (3 passes) {baseline_us:>10.1f} us/doc")
+    print(f"single-pass scan    {scanner_us:>10.1f} us/doc ({baseline_us / scanner_us:.1f}x)")
+    print(f"phone memo          {parse_phone.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Measure cold-start time and resident memory of the spaCy pipeline.
+
+    python -m benchmarks.bench_spacy_load [--docs N]
+
+Each configuration is loaded in a fresh interpreter so the numbers reflect
+what a newly forked gunicorn worker pays: the full en_core_web_sm pipeline
+over whole documents (the old behaviour) versus the NER-only pipeline over the
+name window used by resume.utils.extract_name.
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+PROBE = r"""
+import json, resource, sys, time
+started = time.perf_counter()
+import spacy
+from resume.nlp import EXCLUDED_COMPONENTS, MODEL_NAME, name_window
+from benchmarks.corpus import synthetic_resume_lines
+trimmed = sys.argv[1] == "trimmed"
+nlp = spacy.load(MODEL_NAME, exclude=EXCLUDED_COMPONENTS if trimmed else [])
+load_seconds = time.perf_counter() - started
+texts = ["\n".join(synthetic_resume_lines(seed)) for seed in range(int(sys.argv[2]))]
+started = time.perf_counter()
+for text in texts:
+    nlp(name_window(text) if trimmed else text)
+print(json.dumps({
+    "pipes": nlp.pipe_names,
+    "load_seconds": load_seconds,
+    "ms_per_doc": (time.perf_counter() - started) * 1000 / len(texts),
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'pipeline':<10}{'load s':>10}{'ms/doc':>10}{'peak RSS MB':>14}  components")
+    for mode in ("full", "trimmed"):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE, mode, str(args.docs)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{mode:<10}{result['load_seconds']:>10.2f}{result['ms_per_doc']:>10.2f}"
+              f"{result['rss_mb']:>14.0f}  {', '.join(result['pipes'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Resume corpora for the benchmarks in this package.
+
+Benchmarks accept a directory of real resumes; when none is given they fall
+back to deterministic synthetic resumes generated here.
+"""
+import io
+import os
+import random
+
+FIRST_NAMES = ["Aisha", "Brian", "Chen", "Diego", "Elena", "Farid", "Grace", "Hiro", "Imani", "Jonas"]
+LAST_NAMES = ["Khan", "Lopez", "Miller", "Nguyen", "Okafor", "Patel", "Rossi", "Schmidt", "Tanaka", "Walker"]
+SKILLS = ["Python", "Django", "React", "MongoDB", "Docker", "Kubernetes", "AWS", "SQL", "Go", "TypeScript",
+          "Machine Learning", "GraphQL", "Redis", "Terraform", "Java", "Spring", "C++", "Linux"]
+COMPANIES = ["Acme Corp", "Globex", "Initech", "Umbrella Labs", "Stark Industries", "Wayne Enterprises"]
+TITLES = ["Software Engineer", "Backend Developer", "Data Engineer", "Full Stack Developer", "SRE"]
+VERBS = ["Built", "Designed", "Optimized", "Migrated", "Led", "Automated", "Shipped", "Refactored"]
+OBJECTS = ["a payment service", "the CI pipeline", "search indexing", "an internal dashboard",
+           "the public REST API", "data ingestion jobs", "the onboarding flow", "alerting rules"]
+
+
+def synthetic_resume_lines(seed, jobs=4, tasks_per_job=4):
+    """Return the lines of a plausible resume; the same seed always yields the same resume"""
+    rng = random.Random(seed)
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    lines = [
+        name,
+        f"{name.split()[0].lower()}.{name.split()[1].lower()}@example.com",
+        f"+1 416 555 {rng.randint(1000, 9999)}",
+        "Toronto, ON",
+        "",
+        "Summary",
+        f"{rng.choice(TITLES)} with {rng.randint(2, 12)} years of experience building web services.",
+        "",
+        "Skills",
+        ", ".join(rng.sample(SKILLS, 8)),
+        "",
+        "Experience",
+    ]
+    for _ in range(jobs):
+        start = rng.randint(2010, 2020)
+        lines.append(f"{rng.choice(TITLES)} - {rng.choice(COMPANIES)} ({rng.randint(1, 12):02d}/{start} - "
+                     f"{rng.randint(1, 12):02d}/{start + rng.randint(1, 3)})")
+        for _ in range(tasks_per_job):
+            lines.append(f"- {rng.choice(VERBS)} {rng.choice(OBJECTS)} using {rng.choice(SKILLS)}")
+    lines += [
+        "",
+        "Education",
+        f"B.Sc. Computer Science, University of Toronto, 0{rng.randint(4, 6)}/{rng.randint(2008, 2016)}",
+    ]
+    return lines
+
+
+def _pdf_escape(line):
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)").encode("latin-1", "replace")
+
+
+def make_pdf(lines, lines_per_page=45):
+    """Build a minimal single-font PDF with one text line per output line"""
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+    objects = [None, None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page_lines in pages:
+        body = b" ".join(b"(" + _pdf_escape(line) + b") Tj T*" for line in page_lines)
+        stream = b"BT /F1 10 Tf 14 TL 50 770 Td " + body + b" ET"
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        kids.append(len(objects))
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids), len(kids)
+    )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, obj)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def make_docx(lines, header_lines=0, table_columns=0):
+    """
+    Build a DOCX with one paragraph per line using python-docx. The first
+    ``header_lines`` lines go into the page header, and with ``table_columns``
+    the comma-separated line after "Skills" becomes a table, as in many templates.
+    """
+    import docx
+
+    document = docx.Document()
+    if header_lines:
+        document.sections[0].header.paragraphs[0].text = " | ".join(lines[:header_lines])
+        lines = lines[header_lines:]
+    previous = None
+    for line in lines:
+        if table_columns and previous == "Skills":
+            items = [item.strip() for item in line.split(",")]
+            rows = [items[i:i + table_columns] for i in range(0, len(items), table_columns)]
+            table = document.add_table(rows=len(rows), cols=table_columns)
+            for row, values in zip(table.rows, rows):
+                for cell, value in zip(row.cells, values):
+                    cell.text = value
+        else:
+            document.add_paragraph(line)
+        previous = line
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def load_corpus(directory=None, extension="pdf", size=50, jobs=4):
+    """
+    Return a list of (name, bytes) documents: every *.<extension> file in
+    ``directory`` if given, otherwise ``size`` synthetic resumes.
+    """
+    if directory:
+        documents = []
+        for name in sorted(os.listdir(directory)):
+            if name.lower().endswith(f".{extension}"):
+                with open(os.path.join(directory, name), "rb") as f:
+                    documents.append((name, f.read()))
+        return documents
+
+    build = make_pdf if extension == "pdf" else make_docx
+    return [
+        (f"synthetic-{seed}.{extension}", build(synthetic_resume_lines(seed, jobs=jobs)))
+        for seed in range(size)
+    ]
@@ -0,0 +1,78 @@
+"""
+Local stand-in for the Gemini REST API, for benchmarks that must not spend quota.
+
+Answers ``models/*:generateContent`` with a plausible parse of each resume in
+the prompt (single or ``<resume id=N>`` batched) after a simulated latency of
+a fixed per-request overhead plus a per-output-token generation time.
+"""
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import google.generativeai as genai
+
+_BLOCK_RE = re.compile(r"<resume id=(\S+)>\n(.*?)\n</resume>", re.DOTALL)
+
+
+def _fake_parse(text):
+    lines = [line for line in text.split("\n") if line.strip()]
+    return {
+        "personal": {"name": lines[0] if lines else "", "email": "", "phone": "", "address": "", "summary": None},
+        "skills": [],
+        "experience": [{"jobTitle": line, "company": "", "startDate": "", "endDate": None, "location": "", "tasks": []}
+                       for line in lines[1:]],
+        "projects": [],
+        "education": [],
+    }
+
+
+class FakeGemini:
+    def __init__(self, overhead=0.4, seconds_per_token=0.002):
+        self.requests = 0
+        lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                prompt = body["contents"][0]["parts"][0]["text"]
+                blocks = _BLOCK_RE.findall(prompt)
+                if blocks:
+                    answer = {doc_id: _fake_parse(text) for doc_id, text in blocks}
+                else:
+                    answer = _fake_parse(prompt.split("Resume:\n", 1)[-1])
+                text = json.dumps(answer)
+                output_tokens = len(text) // 4
+                with lock:
+                    fake.requests += 1
+                time.sleep(overhead + output_tokens * seconds_per_token)
+
+                payload = json.dumps({
+                    "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP"}],
+                    "usageMetadata": {
+                        "promptTokenCount": len(prompt) // 4,
+                        "candidatesTokenCount": output_tokens,
+                        "totalTokenCount": len(prompt) // 4 + output_tokens,
+                    },
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.endpoint = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        genai.configure(api_key="fake-key", transport="rest", client_options={"api_endpoint": self.endpoint})
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
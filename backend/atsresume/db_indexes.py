@@ -0,0 +1,97 @@
+# db_indexes.py
+"""
+Index declarations for the MongoDB collections the views query.
+
+``ensure_indexes(db)`` builds them idempotently (``manage.py ensure_indexes``
+runs it at container start). ``QUERY_SHAPES`` lists the filters and sorts the
+views issue, and ``collection_scans(db)`` explains each of them so tests can
+fail when a query shape is not served by an index. The extraction cache, job
+queue and resume version history collections create their own indexes on
+first use. login_logs is only ever read in full, in natural order, so it has
+no index.
+"""
+import pymongo
+from pymongo import IndexModel
+from pymongo.errors import OperationFailure
+
+ASC = pymongo.ASCENDING
+
+INDEXES = {
+    "resumes": [
+        # Listing by owner, paginated in _id order; also serves count_documents/delete_many by user_id
+        IndexModel([("user_id", ASC), ("_id", ASC)], name="user_id__id"),
+        IndexModel([("email", ASC), ("_id", ASC)], name="email__id"),
+        # Image requests for inline photos and recording generated variants
+        IndexModel([("image_id", ASC)], name="image_id", sparse=True),
+    ],
+    "users": [
+        IndexModel([("email", ASC)], name="email_unique", unique=True),
+        # Sparse for accounts stored without a username; unlike a partial index it serves plain equality lookups
+        IndexModel([("username", ASC)], name="username_unique", unique=True, sparse=True),
+    ],
+    "admins": [
+        IndexModel([("email", ASC)], name="email_unique", unique=True),
+    ],
+    "fs.files": [
+        # Photo deduplication looks uploads up by content hash
+        IndexModel([("metadata.sha256", ASC)], name="metadata_sha256", sparse=True),
+    ],
+}
+
+# (collection, filter, sort) for every lookup the views make; values are placeholders
+QUERY_SHAPES = [
+    ("resumes", {"_id": "x"}, None),
+    ("resumes", {"user_id": "x"}, None),
+    ("resumes", {"user_id": "x", "_id": {"$gt": "x"}}, [("_id", ASC)]),
+    ("resumes", {"email": "x"}, None),
+    ("resumes", {"email": "x", "_id": {"$gt": "x"}}, [("_id", ASC)]),
+    ("resumes", {"image_id": "x", "image_inline": {"$ne": None}}, None),
+    ("users", {"email": "x"}, None),
+    ("users", {"username": "x"}, None),
+    ("users", {"_id": "x"}, None),
+    ("admins", {"email": "x"}, None),
+    ("fs.files", {"metadata.sha256": "x", "metadata.deleting": {"$ne": True}}, None),
+]
+
+
+def ensure_indexes(db):
+    """
+    Create every declared index. Returns {collection: [index names]} and
+    raises OperationFailure listing the collections whose build failed (for
+    example a unique index over existing duplicates) after trying them all.
+    """
+    created, failures = {}, []
+    for name, models in INDEXES.items():
+        try:
+            created[name] = db[name].create_indexes(models)
+        except OperationFailure as e:
+            failures.append(f"{name}: {e}")
+    if failures:
+        raise OperationFailure("Index build failed for " + "; ".join(failures))
+    return created
+
+
+def _stages(plan):
+    yield plan.get("stage")
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+
+def plan_stages(collection, query, sort=None):
+    """Stage names of the winning plan for a find"""
+    cursor = collection.find(query)
+    if sort:
+        cursor = cursor.sort(sort)
+    planner = cursor.explain()["queryPlanner"]
+    return [stage for stage in _stages(planner["winningPlan"]) if stage]
+
+
+def collection_scans(db, shapes=QUERY_SHAPES):
+    """Return the (collection, filter, sort) shapes whose winning plan is a COLLSCAN"""
+    return [
+        (name, query, sort) for name, query, sort in shapes
+        if "COLLSCAN" in plan_stages(db[name], query, sort)
+    ]
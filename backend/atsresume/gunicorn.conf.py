@@ -0,0 +1,16 @@
+# Gunicorn hooks; bind address and worker counts are passed on the command line (see Dockerfile)
+import os
+
+
+def on_starting(server):
+    # Load the spaCy NER pipeline once in the master so forked workers share its memory
+    if os.getenv("SPACY_PRELOAD", "1") == "1":
+        from resume.nlp import preload
+        preload()
+
+
+def post_worker_init(worker):
+    # Start the extraction job threads with the worker, so queued jobs and jobs whose lease ran out
+    # in a previous process are claimed without waiting for the first async request
+    from resume.views import extraction_jobs
+    extraction_jobs.start()
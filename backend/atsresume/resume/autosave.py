@@ -0,0 +1,159 @@
+"""
+Write coalescing for builder autosaves.
+
+POST /resume/autosave/<id>/ hands a merge patch to an AutosaveBuffer and is
+acknowledged at once. The buffer folds successive edits to the same resume
+into one pending update and writes every pending resume with a single
+unordered ``bulk_write``, ``interval`` seconds after the first buffered edit
+or as soon as ``max_pending`` resumes are waiting. ``flush()`` is also
+registered with atexit so a graceful shutdown writes the last edits.
+
+Autosaves are last-writer-wins and are not version checked; explicit saves
+go through PUT or PATCH. They leave ``version`` alone, so the version a
+client last got from PATCH stays valid for its next If-Match; retrieve ETags
+still change through ``updated_at``. Each web worker process has its own
+buffer, and an edit is invisible to reads until its flush.
+"""
+import copy
+import logging
+import threading
+from datetime import datetime, timezone
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from .summary import patch_summary_updates
+
+logger = logging.getLogger(__name__)
+
+
+def merge_updates(pending, update):
+    """
+    Fold ``update`` ($set/$unset on dotted paths, as built by
+    resume.patch.merge_patch_update) into ``pending`` in place, so applying
+    ``pending`` once has the effect of applying the two in order. Pending
+    paths never overlap, which MongoDB requires of a single update.
+    """
+    sets, unsets = pending.setdefault("$set", {}), pending.setdefault("$unset", {})
+    changes = [(path, value, True) for path, value in update.get("$set", {}).items()]
+    changes += [(path, None, False) for path in update.get("$unset", {})]
+    for path, value, is_set in changes:
+        for existing in [p for p in (*sets, *unsets) if p == path or p.startswith(path + ".")]:
+            sets.pop(existing, None)
+            unsets.pop(existing, None)
+        ancestor = next((p for p in (*sets, *unsets) if path.startswith(p + ".")), None)
+        if ancestor is None:
+            if is_set:
+                sets[path] = copy.deepcopy(value)
+            else:
+                unsets[path] = ""
+            continue
+
+        # An earlier edit replaced or removed a parent; edit inside its value instead
+        if ancestor in unsets:
+            if not is_set:
+                continue
+            del unsets[ancestor]
+            sets[ancestor] = {}
+        if not isinstance(sets[ancestor], dict):
+            sets[ancestor] = {}
+        target = sets[ancestor]
+        keys = path[len(ancestor) + 1:].split(".")
+        for key in keys[:-1]:
+            if not isinstance(target.get(key), dict):
+                target[key] = {}
+            target = target[key]
+        if is_set:
+            target[keys[-1]] = copy.deepcopy(value)
+        else:
+            target.pop(keys[-1], None)
+    return pending
+
+
+class AutosaveBuffer:
+    """
+    Per-process buffer of pending autosave edits, keyed by resume id.
+
+    ``edits`` and ``writes`` count the edits accepted and the update
+    operations sent to MongoDB. Flushes are serialized so an older edit can
+    never be written after a newer one.
+    """
+
+    def __init__(self, collection, interval=2.0, max_pending=200):
+        self.collection = collection
+        self.interval = interval
+        self.max_pending = max(1, max_pending)
+        self.edits = 0
+        self.writes = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer = None
+
+    def submit(self, resume_id, update):
+        """Buffer an update document for a resume; returns without touching MongoDB unless the buffer is full"""
+        with self._lock:
+            entry = self._pending.setdefault(resume_id, {})
+            merge_updates(entry, update)
+            entry["updated_at"] = datetime.now(timezone.utc)
+            self.edits += 1
+            full = len(self._pending) >= self.max_pending
+            if not full:
+                self._schedule()
+        if full:
+            self.flush()
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def _schedule(self):
+        if self._timer is None:
+            self._timer = threading.Timer(self.interval, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Write every pending resume now; returns the number of resumes written"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if not pending:
+                return 0
+
+            operations = [UpdateOne({"_id": resume_id}, _update(entry), upsert=False)
+                          for resume_id, entry in pending.items()]
+            try:
+                self.collection.bulk_write(operations, ordered=False)
+            except BulkWriteError as e:
+                resume_ids = list(pending)
+                for error in e.details.get("writeErrors", []):
+                    logger.error(f"Autosave of resume {resume_ids[error['index']]} failed: {error.get('errmsg')}")
+            except PyMongoError as e:
+                logger.error(f"Autosave flush failed, keeping {len(pending)} resumes for the next one: {str(e)}")
+                self._requeue(pending)
+                return 0
+            self.writes += len(operations)
+            return len(operations)
+
+    def _requeue(self, pending):
+        with self._lock:
+            for resume_id, entry in pending.items():
+                newer = self._pending.get(resume_id)
+                if newer:
+                    entry["updated_at"] = newer.pop("updated_at")
+                    merge_updates(entry, newer)
+                self._pending[resume_id] = entry
+            self._schedule()
+
+
+def _update(entry):
+    update = {key: value for key, value in entry.items() if key in ("$set", "$unset") and value}
+    summary_sets, summary_increments = patch_summary_updates(update, entry["updated_at"])
+    update["$set"] = {**update.get("$set", {}), **summary_sets}
+    if summary_increments:
+        update["$inc"] = summary_increments
+    return update
@@ -0,0 +1,273 @@
+"""
+Bulk import of resume files into the resumes collection.
+
+Used by the ZIP upload endpoint (POST /resume/import/) and by
+``manage.py import_resumes``. Files are extracted and parsed on a bounded
+thread pool (PDF text extraction itself runs in the extraction process
+pool), LLM calls are capped by a semaphore and optionally packed several
+resumes to a prompt, and parsed resumes are written
+with unordered ``insert_many`` batches. Progress is reported as JSON
+records: "parsed" (or "failed"/"skipped") as soon as a file has been
+handled, then "imported" or "failed" once the batch holding it is written.
+"""
+import logging
+import os
+import threading
+import time
+import traceback
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from .summary import build_summary
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = ("pdf", "doc", "docx")
+
+
+def file_extension(name):
+    return name.rsplit(".", 1)[-1].lower() if "." in name else ""
+
+
+def iter_directory(directory):
+    """Yield (relative path, loader) for every file under a directory, in a stable order"""
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            yield os.path.relpath(path, directory), lambda path=path: _read_file(path)
+
+
+def _read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def iter_zip(archive, max_file_bytes):
+    """
+    Yield (member name, loader) for every file in a ZIP archive. Members that
+    are larger than ``max_file_bytes`` once inflated get a loader that raises,
+    so they are reported instead of decompressed.
+    """
+    for info in archive.infolist():
+        if info.is_dir() or info.filename.startswith("__MACOSX/"):
+            continue
+        if info.file_size > max_file_bytes:
+            yield info.filename, lambda size=info.file_size: _too_large(size, max_file_bytes)
+        else:
+            yield info.filename, lambda info=info: archive.read(info)
+
+
+def _too_large(size, limit):
+    raise ValueError(f"File is {size} bytes; the limit is {limit}")
+
+
+class LLMBatcher:
+    """
+    Callable that coalesces single-text LLM calls from many threads into
+    batched calls. A batch is sent once ``batch_size`` texts are waiting or
+    ``max_wait`` seconds after its first text arrived, whichever is sooner.
+    ``batch_llm(texts)`` must return one result per text, in order; at most
+    ``slots`` batches are in flight at once.
+    """
+
+    def __init__(self, batch_llm, batch_size=4, max_wait=0.5, slots=None):
+        self.batch_llm = batch_llm
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait
+        self._slots = slots or threading.BoundedSemaphore(1)
+        self._queue = []
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def __call__(self, text):
+        future = Future()
+        with self._lock:
+            self._queue.append((text, future))
+            batch = self._take() if len(self._queue) >= self.batch_size else None
+            if batch is None and len(self._queue) == 1:
+                timer = threading.Timer(self.max_wait, self._flush, args=(self._generation,))
+                timer.daemon = True
+                timer.start()
+        if batch:
+            self._send(batch)
+        return future.result()
+
+    def _take(self):
+        batch, self._queue = self._queue[:self.batch_size], self._queue[self.batch_size:]
+        self._generation += 1
+        return batch
+
+    def _flush(self, generation):
+        with self._lock:
+            # The batch this timer was started for may already have been sent full
+            if generation != self._generation or not self._queue:
+                return
+            batch = self._take()
+        self._send(batch)
+
+    def _send(self, batch):
+        try:
+            with self._slots:
+                results = self.batch_llm([text for text, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"Batched LLM returned {len(results)} results for {len(batch)} texts")
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+
+class BulkImporter:
+    """
+    Fan resume files out over ``workers`` threads and store the results.
+
+    ``handler(data, file_extension, llm=..., executor=...)`` must return
+    ``(parsed, cache_status, tier)`` like resume.views.run_extraction; it is
+    given a wrapper around ``llm`` that allows at most ``llm_concurrency``
+    calls at once across all workers, and an executor of its own to run that
+    wrapper on, so an import never waits behind (or holds up) the pool that
+    interactive uploads share. When ``batch_llm`` is given and
+    ``llm_batch_size`` is above 1, texts from concurrent workers are packed
+    into multi-resume calls through an LLMBatcher instead.
+    """
+
+    def __init__(self, collection, handler, llm, workers=4, llm_concurrency=2, batch_size=50, user_id=None,
+                 batch_llm=None, llm_batch_size=1, llm_batch_wait=0.5):
+        self.collection = collection
+        self.handler = handler
+        self.llm = llm
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.user_id = user_id
+        self._llm_slots = threading.BoundedSemaphore(max(1, llm_concurrency))
+        self._batcher = None
+        if batch_llm is not None and llm_batch_size > 1:
+            self._batcher = LLMBatcher(batch_llm, llm_batch_size, llm_batch_wait, self._llm_slots)
+
+    def run(self, files):
+        """
+        Import (name, loader) pairs. Yields a record for each file as soon as
+        it has been parsed, a write record for it once its batch is stored,
+        and a final summary record.
+        """
+        started = time.monotonic()
+        counts = {"files": 0, "parsed": 0, "imported": 0, "failed": 0, "skipped": 0}
+        pending = set()
+        batch = []
+
+        # One LLM thread per worker: a worker waits on at most one LLM call, so calls never queue
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bulk-import") as pool, \
+                ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bulk-llm") as llm_pool:
+            for name, loader in files:
+                counts["files"] += 1
+                if file_extension(name) not in SUPPORTED_EXTENSIONS:
+                    counts["skipped"] += 1
+                    yield {"file": name, "status": "skipped", "error": "Unsupported file format"}
+                    continue
+
+                # Keep only a bounded number of files in memory at once
+                while len(pending) >= self.workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    yield from self._collect(done, batch, counts)
+                pending.add(pool.submit(self._process, name, loader, llm_pool))
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                yield from self._collect(done, batch, counts)
+        yield from self._flush(batch, counts)
+
+        counts["seconds"] = round(time.monotonic() - started, 3)
+        yield {"summary": counts}
+
+    def _collect(self, futures, batch, counts):
+        for future in futures:
+            record, document = future.result()
+            if document is None:
+                counts["failed"] += 1
+            else:
+                counts["parsed"] += 1
+                batch.append((record["file"], document))
+            # Reported now; the write result follows when the batch is flushed
+            yield record
+            if len(batch) >= self.batch_size:
+                yield from self._flush(batch, counts)
+
+    def _process(self, name, loader, llm_pool):
+        try:
+            data = loader()
+            parsed, cache_status, tier = self.handler(
+                data, file_extension(name), llm=self._bounded_llm, executor=llm_pool
+            )
+        except Exception as e:
+            logger.error(f"Bulk import of {name} failed: {traceback.format_exc()}")
+            return {"file": name, "status": "failed", "error": str(e)}, None
+
+        resume_id = str(ObjectId())
+        now = datetime.now(timezone.utc)
+        personal = parsed.get("personal") if isinstance(parsed, dict) else None
+        document = {
+            "_id": resume_id,
+            "user_id": self.user_id,
+            "title": "",
+            "resume_details": parsed,
+            "email": (personal or {}).get("email") or "",
+            "image_id": None,
+            "source_file": name,
+            "updated_at": now,
+            "version": 1,
+            "summary": build_summary("", parsed, now),
+        }
+        record = {
+            "file": name,
+            "status": "parsed",
+            "resume_id": resume_id,
+            "tier": tier,
+            "cache": cache_status,
+            "result": parsed,
+        }
+        return record, document
+
+    def _bounded_llm(self, text, fields=None):
+        if fields is not None:
+            # Batched prompts ask for the whole schema, so field-only requests go out on their own
+            with self._llm_slots:
+                return self.llm(text, fields=fields)
+        if self._batcher is not None:
+            return self._batcher(text)
+        with self._llm_slots:
+            return self.llm(text)
+
+    def _flush(self, batch, counts):
+        if not batch:
+            return
+        failed = {}
+        try:
+            self.collection.insert_many([document for _, document in batch], ordered=False)
+        except BulkWriteError as e:
+            failed = {error["index"]: error.get("errmsg", "Write failed") for error in e.details.get("writeErrors", [])}
+        except PyMongoError as e:
+            logger.error(f"Bulk import batch write failed: {str(e)}")
+            failed = {index: str(e) for index in range(len(batch))}
+        for index, (name, document) in enumerate(batch):
+            if index in failed:
+                counts["failed"] += 1
+                yield {"file": name, "status": "failed", "resume_id": document["_id"], "error": failed[index]}
+            else:
+                counts["imported"] += 1
+                yield {"file": name, "status": "imported", "resume_id": document["_id"]}
+        batch.clear()
+
+
+def open_zip(uploaded_file):
+    """Open an uploaded archive, raising ValueError if it is not a ZIP file"""
+    try:
+        return zipfile.ZipFile(uploaded_file)
+    except zipfile.BadZipFile:
+        raise ValueError("Uploaded file is not a valid ZIP archive")
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+import pymongo
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+
+def content_digest(chunks):
+    """Return the SHA-256 hex digest of an iterable of byte chunks."""
+    sha = hashlib.sha256()
+    for chunk in chunks:
+        sha.update(chunk)
+    return sha.hexdigest()
+
+
+class ExtractionCache:
+    """
+    Content-addressed cache for resume extraction results.
+
+    Entries are keyed by the SHA-256 of the uploaded file (with the extractor
+    that read it, see resume.views.extraction_cache_key) and hold both the
+    extracted text and the structured data returned by the parser. Lookups go
+    to a bounded in-process LRU first and fall back to a Mongo collection that
+    expires documents through a TTL index. ``max_bytes`` bounds the LRU by
+    the UTF-8 size of each entry's text plus its parsed data serialized as
+    JSON, which approximates (and undercounts) the memory the objects hold.
+    """
+
+    def __init__(self, collection, max_entries=256, max_bytes=32 * 1024 * 1024, ttl_seconds=7 * 24 * 3600):
+        self.collection = collection
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self._entries = OrderedDict()  # digest -> (expires_at, size, entry)
+        self._size = 0
+        self._lock = threading.Lock()
+        self._indexed = False
+
+        self.local_hits = 0
+        self.remote_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, digest):
+        """Return the cached entry for a digest, or None on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            item = self._entries.get(digest)
+            if item is not None:
+                expires_at, size, entry = item
+                if expires_at > now:
+                    self._entries.move_to_end(digest)
+                    self.local_hits += 1
+                    return entry
+                self._discard(digest)
+
+        try:
+            document = self.collection.find_one({"_id": digest})
+        except PyMongoError as e:
+            logger.warning(f"Extraction cache lookup failed: {str(e)}")
+            document = None
+        if document is None or self._is_expired(document):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        entry = {"text": document.get("text", ""), "parsed": document.get("parsed")}
+        size = _entry_size(entry)
+        with self._lock:
+            self.remote_hits += 1
+            self._remember(digest, entry, size)
+        return entry
+
+    def put(self, digest, text, parsed):
+        """Store extracted text and parsed data for a digest."""
+        entry = {"text": text, "parsed": parsed}
+        now = datetime.now(timezone.utc)
+        try:
+            self._ensure_indexes()
+            self.collection.replace_one(
+                {"_id": digest},
+                {"_id": digest, "text": text, "parsed": parsed, "created_at": now},
+                upsert=True,
+            )
+        except PyMongoError as e:
+            logger.warning(f"Extraction cache write failed: {str(e)}")
+        size = _entry_size(entry)  # Serialized outside the lock
+        with self._lock:
+            self._remember(digest, entry, size)
+
+    def stats(self):
+        """Return hit/miss counters and the current size of the local LRU."""
+        with self._lock:
+            hits = self.local_hits + self.remote_hits
+            total = hits + self.misses
+            return {
+                "local_hits": self.local_hits,
+                "remote_hits": self.remote_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(hits / total, 4) if total else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._size,
+            }
+
+    def clear(self):
+        """Drop every entry from the local LRU (the Mongo collection is untouched)."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _remember(self, digest, entry, size):
+        if size > self.max_bytes:
+            return
+        if digest in self._entries:
+            self._discard(digest)
+        self._entries[digest] = (time.monotonic() + self.ttl_seconds, size, entry)
+        self._size += size
+        while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._discard(oldest)
+            self.evictions += 1
+
+    def _discard(self, digest):
+        _, size, _ = self._entries.pop(digest)
+        self._size -= size
+
+    def _is_expired(self, document):
+        # The TTL monitor only runs once a minute, so guard against stale reads.
+        created_at = document.get("created_at")
+        if created_at is None:
+            return False
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        return created_at + timedelta(seconds=self.ttl_seconds) < datetime.now(timezone.utc)
+
+    def _ensure_indexes(self):
+        if self._indexed:
+            return
+        self.collection.create_index(
+            [("created_at", pymongo.ASCENDING)],
+            expireAfterSeconds=self.ttl_seconds,
+            name="created_at_ttl",
+        )
+        self._indexed = True
+
+
+def _entry_size(entry):
+    text = entry["text"] or ""
+    parsed = json.dumps(entry["parsed"], ensure_ascii=False, separators=(",", ":"), default=str)
+    return len(text.encode("utf-8")) + len(parsed.encode("utf-8"))
@@ -0,0 +1,424 @@
+"""
+Text extraction for uploaded resumes. Both resume.views and resume.utils go
+through this module; PDFs are extracted in a process pool, off the GIL.
+"""
+import atexit
+import io
+import logging
+import mmap
+import multiprocessing
+import re
+import resource
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+
+import pdfplumber
+import pypdfium2
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+# Joins the pages of a PDF: line-based readers see a blank line, resume.prompt.clean_text sees page edges
+PAGE_BREAK = "\n\f"
+
+
+class ExtractionError(Exception):
+    """Base class for errors the upload view reports back to the client."""
+
+
+class PageLimitExceeded(ExtractionError):
+    pass
+
+
+class ExtractionTimeout(ExtractionError):
+    pass
+
+
+class UnknownBackend(ExtractionError):
+    pass
+
+
+class MappedUpload(mmap.mmap):
+    """Read-only mmap of an upload Django spooled to disk; ``path`` is the spooled file"""
+    path = None
+
+
+@contextmanager
+def open_upload_buffer(uploaded_file):
+    """
+    Yield the raw bytes of an upload without copying them to a new temp file.
+    Small uploads are already held in memory by Django; larger ones are spooled
+    to disk by Django and memory-mapped from there (a MappedUpload, whose path
+    is what the PDF extraction workers open).
+    """
+    if hasattr(uploaded_file, "temporary_file_path") and uploaded_file.size:
+        with open(uploaded_file.temporary_file_path(), "rb") as f:
+            with MappedUpload(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                mapped.path = uploaded_file.temporary_file_path()
+                yield mapped
+    else:
+        uploaded_file.seek(0)
+        yield uploaded_file.read()
+
+
+class MappedFile(io.RawIOBase):
+    """Read-only, seekable file object over an mmap (mmap itself is not seekable() before 3.13)"""
+
+    def __init__(self, mapped):
+        self._mapped = mapped
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._mapped.tell()
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        self._mapped.seek(offset, whence)
+        return self._mapped.tell()
+
+    def readinto(self, b):
+        start = self._mapped.tell()
+        size = min(len(b), len(self._mapped) - start)
+        with memoryview(self._mapped) as view:
+            b[:size] = view[start:start + size]
+        self._mapped.seek(start + size)
+        return size
+
+
+def _as_stream(source):
+    """Wrap in-memory bytes or an mmap in a seekable file object; paths and streams pass through"""
+    if isinstance(source, mmap.mmap):
+        return MappedFile(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    return source
+
+
+def _pdf_source(source):
+    """
+    What to send the extraction workers for a PDF (their arguments must be
+    picklable): the file path when the PDF is on disk, so a spooled upload is
+    never copied into memory, otherwise its bytes.
+    """
+    if isinstance(source, str):
+        return source
+    if isinstance(source, MappedUpload) and source.path:
+        return source.path
+    if isinstance(source, bytes):
+        return source
+    if isinstance(source, (bytearray, memoryview, mmap.mmap)):
+        return bytes(source)
+    source.seek(0)
+    return source.read()
+
+
+def count_pdf_pages(data):
+    """Return the number of pages in a PDF without running layout analysis"""
+    pdf = pypdfium2.PdfDocument(data)
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+
+def _peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# name -> callable(pdf bytes or path, start, stop) returning one text string per page
+PDF_BACKENDS = {}
+
+
+def register_pdf_backend(name):
+    """Register a PDF text backend under ``name`` so it can be selected per request or in settings"""
+    def decorator(func):
+        PDF_BACKENDS[name] = func
+        return func
+    return decorator
+
+
+@register_pdf_backend("pypdfium2")
+def extract_pages_pypdfium2(data, start, stop):
+    """Plain text straight from PDFium's text layer; several times faster than layout analysis"""
+    pdf = pypdfium2.PdfDocument(data)
+    try:
+        pages = []
+        for index in range(start, stop):
+            page = pdf[index]
+            textpage = page.get_textpage()
+            pages.append(textpage.get_text_bounded().replace("\r\n", "\n").strip())
+            textpage.close()
+            page.close()
+        return pages
+    finally:
+        pdf.close()
+
+
+@register_pdf_backend("pdfplumber")
+def extract_pages_pdfplumber(data, start, stop):
+    """pdfplumber layout analysis; slower, but copes with unusual text ordering"""
+    with pdfplumber.open(data if isinstance(data, str) else io.BytesIO(data),
+                         pages=list(range(start + 1, stop + 1))) as pdf:
+        return [page.extract_text() or "" for page in pdf.pages]
+
+
+def looks_degraded(text):
+    """Heuristic check for page text that the fast backend probably mangled"""
+    stripped = text.strip()
+    if not stripped:
+        return True
+    bad = sum(1 for ch in stripped if ch == "\ufffd" or (ord(ch) < 32 and ch not in "\n\t"))
+    if bad / len(stripped) > 0.05:
+        return True
+    lines = [line for line in stripped.split("\n") if line.strip()]
+    # Characters emitted one per line usually mean the reading order fell apart
+    if len(lines) >= 10 and sum(1 for line in lines if len(line.strip()) <= 2) / len(lines) > 0.4:
+        return True
+    words = stripped.split()
+    # Missing inter-word spaces show up as implausibly long "words"
+    return len(stripped) / len(words) > 25
+
+
+@register_pdf_backend("auto")
+def extract_pages_auto(data, start, stop):
+    """pypdfium2 first, falling back to pdfplumber only for pages that look degraded"""
+    pages = extract_pages_pypdfium2(data, start, stop)
+    for offset, text in enumerate(pages):
+        if looks_degraded(text):
+            pages[offset] = extract_pages_pdfplumber(data, start + offset, start + offset + 1)[0]
+    return pages
+
+
+def _extract_page_range(data, start, stop, backend="auto"):
+    """Worker task: extract the text of pages [start, stop) and report the worker's peak RSS"""
+    return PDF_BACKENDS[backend](data, start, stop), _peak_rss_mb()
+
+
+class ExtractionEngine:
+    """
+    Process pool for PDF text extraction.
+
+    Workers are started lazily with the ``spawn`` method so they never inherit
+    the Mongo clients of a gunicorn worker. Each worker is replaced after
+    ``max_tasks_per_child`` jobs, and the whole pool is recycled once a worker
+    reports a peak RSS above ``max_rss_mb`` or a document misses its deadline.
+    With ``processes=0`` extraction runs inline on the calling thread.
+    """
+
+    def __init__(self, processes=2, pages_per_task=2, max_pages=20, timeout=20.0,
+                 max_tasks_per_child=50, max_rss_mb=512, backend="auto"):
+        if backend not in PDF_BACKENDS:
+            raise ValueError(f"Unknown PDF backend: {backend}")
+        self.processes = processes
+        self.pages_per_task = max(1, pages_per_task)
+        self.max_pages = max_pages
+        self.timeout = timeout
+        self.max_tasks_per_child = max_tasks_per_child
+        self.max_rss_mb = max_rss_mb
+        self.backend = backend
+
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def extract_pdf(self, source, backend=None):
+        """Extract the text of a PDF, page ranges in parallel, joined in page order"""
+        backend = backend or self.backend
+        if backend not in PDF_BACKENDS:
+            raise UnknownBackend(f"Unknown PDF extractor: {backend}")
+        data = _pdf_source(source)
+        page_count = count_pdf_pages(data)
+        if page_count > self.max_pages:
+            raise PageLimitExceeded(f"PDF has {page_count} pages; the limit is {self.max_pages}")
+
+        ranges = [
+            (start, min(start + self.pages_per_task, page_count))
+            for start in range(0, page_count, self.pages_per_task)
+        ]
+        if self.processes <= 0:
+            pages = []
+            for start, stop in ranges:
+                pages.extend(_extract_page_range(data, start, stop, backend)[0])
+            return PAGE_BREAK.join(pages).strip()
+
+        deadline = time.monotonic() + self.timeout
+        pool = self._get_pool()
+        pending = [
+            pool.apply_async(_extract_page_range, (data, start, stop, backend))
+            for start, stop in ranges
+        ]
+
+        pages = []
+        peak_rss = 0
+        try:
+            for result in pending:
+                chunk, rss = result.get(timeout=max(deadline - time.monotonic(), 0))
+                pages.extend(chunk)
+                peak_rss = max(peak_rss, rss)
+        except multiprocessing.TimeoutError:
+            self._recycle(pool, terminate=True)
+            raise ExtractionTimeout(f"PDF extraction exceeded {self.timeout} seconds")
+
+        if peak_rss > self.max_rss_mb:
+            logger.info(f"Recycling extraction pool: worker RSS {peak_rss:.0f} MB over {self.max_rss_mb} MB")
+            self._recycle(pool)
+        return PAGE_BREAK.join(pages).strip()
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.terminate()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                context = multiprocessing.get_context("spawn")
+                self._pool = context.Pool(self.processes, maxtasksperchild=self.max_tasks_per_child)
+            return self._pool
+
+    def _recycle(self, pool, terminate=False):
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        if terminate:
+            pool.terminate()
+        else:
+            # Let in-flight jobs from other threads finish before the workers exit
+            pool.close()
+        threading.Thread(target=pool.join, daemon=True).start()
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Return the process-wide extraction engine, configured from Django settings when available"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            options = {}
+            from django.conf import settings
+            if settings.configured:
+                options = {
+                    "processes": getattr(settings, "EXTRACTION_POOL_PROCESSES", 2),
+                    "pages_per_task": getattr(settings, "EXTRACTION_PAGES_PER_TASK", 2),
+                    "max_pages": getattr(settings, "EXTRACTION_MAX_PAGES", 20),
+                    "timeout": getattr(settings, "EXTRACTION_TIMEOUT_SECONDS", 20.0),
+                    "max_tasks_per_child": getattr(settings, "EXTRACTION_MAX_TASKS_PER_CHILD", 50),
+                    "max_rss_mb": getattr(settings, "EXTRACTION_MAX_RSS_MB", 512),
+                    "backend": getattr(settings, "PDF_EXTRACTOR", "auto"),
+                }
+            _engine = ExtractionEngine(**options)
+            atexit.register(_engine.shutdown)
+        return _engine
+
+
+def extract_text_from_pdf(source, backend=None):
+    """Extract text from a PDF file path, stream or in-memory buffer"""
+    try:
+        return get_engine().extract_pdf(source, backend=backend)
+    except ExtractionError:
+        raise
+    except Exception as e:
+        print(f"Error extracting text from PDF: {e}")
+        return ""
+
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+_DOCX_PARAGRAPH = _W + "p"
+_DOCX_BLOCKS = {_DOCX_PARAGRAPH, _W + "tbl", _W + "sdt"}
+_DOCX_RUN = _W + "r"
+# Paragraph and run properties hold layout, such as tab stop definitions (w:tabs/w:tab), not text
+_DOCX_PROPERTIES = {_W + "pPr", _W + "rPr"}
+_DOCX_TEXT = {_W + "t": None, _W + "tab": "\t", _W + "br": "\n", _W + "cr": "\n", _W + "noBreakHyphen": "-"}
+_DOCX_PART_RE = re.compile(r"word/(header|footer)(\d*)\.xml")
+
+
+def _docx_parts(archive):
+    """Headers, then the body, then footers: the order they read in on a rendered page"""
+    parts = {"header": [], "footer": []}
+    for name in archive.namelist():
+        match = _DOCX_PART_RE.fullmatch(name)
+        if match:
+            parts[match.group(1)].append((int(match.group(2) or 0), name))
+    return (
+        [name for _, name in sorted(parts["header"])]
+        + ["word/document.xml"]
+        + [name for _, name in sorted(parts["footer"])]
+    )
+
+
+def iter_docx_paragraphs(stream):
+    """
+    Yield the text of every paragraph in one WordprocessingML part, in document
+    order, without building the tree: paragraphs inside tables and text boxes
+    are included, and each element is freed as soon as it has been read.
+    """
+    buffers = []  # One per open paragraph; text box paragraphs nest inside their anchor's paragraph
+    skipping = 0
+    runs = 0  # Text elements only count inside a w:r run
+    for event, elem in etree.iterparse(stream, events=("start", "end")):
+        tag = elem.tag
+        if tag == _MC_FALLBACK or tag in _DOCX_PROPERTIES:
+            # Text boxes are written twice: DrawingML in mc:Choice and a VML copy in mc:Fallback.
+            # Properties are skipped too
+            skipping += 1 if event == "start" else -1
+            if event == "end":
+                elem.clear()
+            continue
+        if skipping:
+            continue
+        if tag == _DOCX_RUN:
+            runs += 1 if event == "start" else -1
+
+        if event == "start":
+            if tag == _DOCX_PARAGRAPH:
+                buffers.append([])
+            continue
+
+        if tag in _DOCX_TEXT and buffers and runs:
+            replacement = _DOCX_TEXT[tag]
+            buffers[-1].append((elem.text or "") if replacement is None else replacement)
+        elif tag in _DOCX_BLOCKS:
+            if tag == _DOCX_PARAGRAPH:
+                yield "".join(buffers.pop())
+            elem.clear()
+            # Drop already-read siblings so memory stays flat on long documents
+            parent = elem.getparent()
+            if parent is not None:
+                while elem.getprevious() is not None:
+                    del parent[0]
+
+
+def extract_docx_text(source):
+    """Extract the text of a DOCX, including headers, footers, tables and text boxes"""
+    with zipfile.ZipFile(_as_stream(source)) as archive:
+        lines = []
+        seen_parts = set()
+        for name in _docx_parts(archive):
+            if name not in archive.NameToInfo:
+                continue
+            with archive.open(name) as part:
+                text = "\n".join(iter_docx_paragraphs(part)).strip()
+            # First-page and default headers usually repeat each other
+            if text and text not in seen_parts:
+                seen_parts.add(text)
+                lines.append(text)
+        return "\n".join(lines)
+
+
+def extract_text_from_docx(source):
+    """Extract text from a DOCX file path, stream or in-memory buffer"""
+    try:
+        return extract_docx_text(source)
+    except Exception as e:
+        print(f"Error extracting text from DOCX: {e}")
+        return ""
@@ -0,0 +1,263 @@
+"""
+Process-wide Gemini client used by the resume parser.
+
+The model object (and with it the API client and its connections) is built
+once per process. Every call has an explicit deadline, retryable API errors
+are retried with exponential backoff, and a duplicate request can optionally
+be hedged once a call runs longer than the observed p95 latency.
+"""
+import itertools
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import google.generativeai as genai
+from google.api_core import exceptions as api_exceptions
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_ERRORS = (
+    api_exceptions.TooManyRequests,
+    api_exceptions.InternalServerError,
+    api_exceptions.ServiceUnavailable,
+    api_exceptions.GatewayTimeout,
+    api_exceptions.DeadlineExceeded,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+class GeminiError(Exception):
+    pass
+
+
+class GeminiTimeout(GeminiError):
+    pass
+
+
+class LatencyStats:
+    """Rolling window of call latencies plus lifetime counters"""
+
+    def __init__(self, window=200):
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+
+    def record(self, seconds, prompt_tokens=0, output_tokens=0):
+        with self._lock:
+            self._latencies.append(seconds)
+            self.prompt_tokens += prompt_tokens
+            self.output_tokens += output_tokens
+
+    def increment(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def quantile(self, q):
+        with self._lock:
+            ordered = sorted(self._latencies)
+        if not ordered:
+            return None
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def snapshot(self):
+        """Return counters and latency quantiles in seconds"""
+        with self._lock:
+            samples = len(self._latencies)
+            counters = {
+                "calls": self.calls,
+                "errors": self.errors,
+                "retries": self.retries,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "prompt_tokens": self.prompt_tokens,
+                "output_tokens": self.output_tokens,
+            }
+        return {
+            **counters,
+            "samples": samples,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+class GeminiClient:
+    """
+    One-shot ``generate_content`` calls against a single reused model.
+
+    ``attempt_timeout`` bounds each HTTP request and ``deadline`` bounds the
+    whole call including retries and backoff, so a slow Gemini response can
+    never hold a request thread longer than ``deadline`` seconds. With
+    ``hedge`` enabled, a second identical request is sent once the first has
+    run longer than the p95 of recent calls and the first answer wins.
+    """
+
+    def __init__(self, model_name="gemini-2.0-flash", attempt_timeout=15.0, deadline=25.0, max_attempts=3,
+                 backoff_initial=0.5, backoff_max=8.0, hedge=False, hedge_min_samples=20, model=None):
+        self.model_name = model_name
+        self.attempt_timeout = attempt_timeout
+        self.deadline = deadline
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.model = model or genai.GenerativeModel(model_name)
+        self.stats = LatencyStats()
+
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="gemini") if hedge else None
+
+    def generate(self, prompt):
+        """Send a prompt and return the response, retrying retryable errors until the deadline"""
+        started = time.monotonic()
+        response, attempts = self._with_retries(lambda timeout: self._attempt(prompt, timeout), started)
+        self._record(response, started, attempts)
+        return response
+
+    def stream(self, prompt):
+        """
+        Send a prompt in streaming mode and yield the response text chunk by chunk.
+        Retries only cover opening the stream, up to the first chunk; errors after
+        that are raised to the caller.
+        """
+        started = time.monotonic()
+        (response, chunks), attempts = self._with_retries(lambda timeout: self._open_stream(prompt, timeout), started)
+        first_chunk = time.monotonic() - started
+        try:
+            for chunk in chunks:
+                try:
+                    text = chunk.text
+                except ValueError:
+                    continue  # A chunk carrying only a finish reason or safety ratings
+                yield text
+        except Exception:
+            self.stats.increment("errors")
+            raise
+        self._record(response, started, attempts, first_chunk)
+
+    def _with_retries(self, call, started):
+        self.stats.increment("calls")
+        deadline = started + self.deadline
+        for attempt in range(1, self.max_attempts + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                return call(min(self.attempt_timeout, remaining)), attempt
+            except RETRYABLE_ERRORS as e:
+                logger.warning(f"Gemini attempt {attempt}/{self.max_attempts} failed: {str(e)}")
+                if attempt == self.max_attempts:
+                    self.stats.increment("errors")
+                    raise
+                delay = min(self.backoff_max, self.backoff_initial * 2 ** (attempt - 1))
+                delay = random.uniform(delay / 2, delay)  # Jitter so workers do not retry in lockstep
+                if time.monotonic() + delay >= deadline:
+                    break
+                self.stats.increment("retries")
+                time.sleep(delay)
+            except Exception:
+                self.stats.increment("errors")
+                raise
+
+        self.stats.increment("errors")
+        raise GeminiTimeout(f"Gemini did not answer within {self.deadline} seconds")
+
+    def _record(self, response, started, attempts, first_chunk=None):
+        elapsed = time.monotonic() - started
+        prompt_tokens, output_tokens = _token_usage(response)
+        self.stats.record(elapsed, prompt_tokens, output_tokens)
+        streamed = f", first chunk after {first_chunk:.2f}s" if first_chunk is not None else ""
+        logger.info(
+            f"Gemini call to {self.model_name} took {elapsed:.2f}s{streamed} ({attempts} attempt(s)), "
+            f"{prompt_tokens} input / {output_tokens} output tokens"
+        )
+
+    def _request(self, prompt, timeout, stream=False):
+        return self.model.generate_content(prompt, stream=stream, request_options={"timeout": timeout})
+
+    def _open_stream(self, prompt, timeout):
+        response = self._request(prompt, timeout, stream=True)
+        chunks = iter(response)
+        # Pull the first chunk here so connection errors are still retryable
+        first = next(chunks, None)
+        return response, (chunks if first is None else itertools.chain([first], chunks))
+
+    def _attempt(self, prompt, timeout):
+        hedge_after = self._hedge_delay()
+        if hedge_after is None or hedge_after >= timeout:
+            return self._request(prompt, timeout)
+
+        attempt_deadline = time.monotonic() + timeout
+        primary = self._executor.submit(self._request, prompt, timeout)
+        done, _ = wait([primary], timeout=hedge_after)
+        if done:
+            return primary.result()
+
+        self.stats.increment("hedges")
+        hedged = self._executor.submit(self._request, prompt, max(attempt_deadline - time.monotonic(), 0.1))
+        pending = {primary, hedged}
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=max(attempt_deadline - time.monotonic(), 0),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    if future is hedged:
+                        self.stats.increment("hedge_wins")
+                    return future.result()
+                error = future.exception()
+        # The losing request keeps running in the pool until its own timeout
+        if error is not None:
+            raise error
+        raise TimeoutError(f"Gemini attempt exceeded {timeout:.1f} seconds")
+
+    def _hedge_delay(self):
+        if not self.hedge or self.stats.snapshot()["samples"] < self.hedge_min_samples:
+            return None
+        return self.stats.quantile(0.95)
+
+
+def _token_usage(response):
+    """Input and output token counts reported by the API, 0 when the response has none"""
+    usage = getattr(response, "usage_metadata", None)
+    counts = []
+    for field in ("prompt_token_count", "candidates_token_count"):
+        count = getattr(usage, field, 0)
+        counts.append(count if isinstance(count, int) else 0)
+    return tuple(counts)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_gemini_client():
+    """Return the process-wide Gemini client, configured from Django settings when available"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            options = {}
+            from django.conf import settings
+            if settings.configured:
+                options = {
+                    "model_name": getattr(settings, "GEMINI_MODEL", "gemini-2.0-flash"),
+                    "attempt_timeout": getattr(settings, "GEMINI_ATTEMPT_TIMEOUT_SECONDS", 15.0),
+                    "deadline": getattr(settings, "GEMINI_DEADLINE_SECONDS", 25.0),
+                    "max_attempts": getattr(settings, "GEMINI_MAX_ATTEMPTS", 3),
+                    "hedge": getattr(settings, "GEMINI_HEDGE", False),
+                    "hedge_min_samples": getattr(settings, "GEMINI_HEDGE_MIN_SAMPLES", 20),
+                }
+            _client = GeminiClient(**options)
+        return _client
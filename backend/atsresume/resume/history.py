@@ -0,0 +1,158 @@
+"""
+Delta-compressed version history for resumes.
+
+Saving a version records the resume's title and resume_details in the
+``resume_versions`` collection. Every ``snapshot_every`` versions (and
+whenever a diff would not be smaller) the full content is stored; the
+versions in between hold a JSON Patch (RFC 6902) from the version before, so
+history grows with the size of the edits rather than the number of versions.
+Any version is rebuilt from its snapshot and at most ``snapshot_every - 1``
+diffs, fetched with one query; listings never read content or diffs.
+"""
+import difflib
+import json
+from datetime import datetime, timezone
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError
+
+from .patch import apply_json_patch
+
+SNAPSHOT = "snapshot"
+DIFF = "diff"
+
+# Fields returned when listing versions
+VERSION_FIELDS = ("number", "label", "title", "kind", "size", "resume_version", "created_at")
+VERSION_LIST_PROJECTION = {"_id": 0, **{field: 1 for field in VERSION_FIELDS}}
+
+
+def _escape(token):
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def _valid_key(key):
+    # resume.patch addresses members as MongoDB field names
+    return bool(key) and "." not in key and not key.startswith("$")
+
+
+def json_diff(old, new, path=""):
+    """
+    JSON Patch operations turning ``old`` into ``new``. Objects and arrays are
+    compared member by member; arrays are matched element by element, so
+    inserting, removing or moving one entry costs one or two operations.
+    """
+    if old == new:
+        return []
+    if isinstance(old, dict) and isinstance(new, dict) and all(_valid_key(key) for key in (*old, *new)):
+        operations = [{"op": "remove", "path": f"{path}/{_escape(key)}"} for key in old if key not in new]
+        for key, value in new.items():
+            member = f"{path}/{_escape(key)}"
+            if key not in old:
+                operations.append({"op": "add", "path": member, "value": value})
+            else:
+                operations.extend(json_diff(old[key], value, member))
+        return operations
+    if isinstance(old, list) and isinstance(new, list):
+        matcher = difflib.SequenceMatcher(None, [_key(item) for item in old], [_key(item) for item in new],
+                                          autojunk=False)
+        operations = []
+        # Blocks are handled in order, so new[:j1] is in place and old[i1:] follows it
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                continue
+            paired = min(i2 - i1, j2 - j1) if tag == "replace" else 0
+            for offset in range(paired):
+                operations.extend(json_diff(old[i1 + offset], new[j1 + offset], f"{path}/{j1 + offset}"))
+            for index in range(j1 + paired, j2):
+                operations.append({"op": "add", "path": f"{path}/{index}", "value": new[index]})
+            operations.extend({"op": "remove", "path": f"{path}/{j2}"} for _ in range(i2 - i1 - paired))
+        return operations
+    return [{"op": "replace", "path": path, "value": new}]
+
+
+def _key(value):
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def _size(value):
+    return len(json.dumps(value, separators=(",", ":"), default=str))
+
+
+def resume_content(resume):
+    """The part of a resume that is versioned"""
+    return {"title": resume.get("title") or "", "resume_details": resume.get("resume_details") or {}}
+
+
+class ResumeHistory:
+    """
+    Numbered versions of each resume, stored as periodic snapshots with JSON
+    Patch diffs in between. Each entry records ``base``, the number of the
+    snapshot its diff chain starts from.
+    """
+
+    def __init__(self, collection, snapshot_every=10):
+        self.collection = collection
+        self.snapshot_every = max(1, snapshot_every)
+        self._indexed = False
+
+    def _ensure_indexes(self):
+        if self._indexed:
+            return
+        self.collection.create_index(
+            [("resume_id", ASCENDING), ("number", DESCENDING)], name="resume_id_number", unique=True
+        )
+        self._indexed = True
+
+    def create(self, resume, label="", attempts=3):
+        """Save the resume's current content as its next version and return the version's listing fields"""
+        self._ensure_indexes()
+        content = resume_content(resume)
+        for _ in range(attempts):
+            latest = self.collection.find_one(
+                {"resume_id": resume["_id"]}, {"number": 1, "base": 1}, sort=[("number", DESCENDING)]
+            )
+            entry = self._entry(resume["_id"], content, latest)
+            entry.update({
+                "resume_id": resume["_id"],
+                "label": label,
+                "title": content["title"],
+                "resume_version": resume.get("version"),
+                "created_at": datetime.now(timezone.utc),
+            })
+            try:
+                self.collection.insert_one(entry)
+            except DuplicateKeyError:
+                continue  # Another save took this number; diff against it instead
+            return {field: entry.get(field) for field in VERSION_FIELDS}
+        raise DuplicateKeyError(f"Could not number a new version of resume {resume['_id']}")
+
+    def _entry(self, resume_id, content, latest):
+        if latest is None:
+            return {"number": 1, "base": 1, "kind": SNAPSHOT, "content": content, "size": _size(content)}
+        number = latest["number"] + 1
+        if number - latest["base"] < self.snapshot_every:
+            previous = self.get(resume_id, latest["number"])
+            diff = json_diff(resume_content(previous), content)
+            if _size(diff) < _size(content):
+                return {"number": number, "base": latest["base"], "kind": DIFF, "diff": diff, "size": _size(diff)}
+        return {"number": number, "base": number, "kind": SNAPSHOT, "content": content, "size": _size(content)}
+
+    def list(self, resume_id):
+        """Version listing fields, newest first, without content or diffs"""
+        return list(self.collection.find({"resume_id": resume_id}, VERSION_LIST_PROJECTION).sort("number", DESCENDING))
+
+    def get(self, resume_id, number):
+        """Rebuild a version; returns its listing fields plus title and resume_details, or None"""
+        entry = self.collection.find_one({"resume_id": resume_id, "number": number}, {"base": 1})
+        if entry is None:
+            return None
+        chain = self.collection.find(
+            {"resume_id": resume_id, "number": {"$gte": entry["base"], "$lte": number}}
+        ).sort("number", ASCENDING)
+        content = last = None
+        for last in chain:
+            content = last["content"] if last["kind"] == SNAPSHOT else apply_json_patch(content, last["diff"])
+        return {**{field: last.get(field) for field in VERSION_FIELDS}, **content}
+
+    def delete(self, resume_id):
+        return self.collection.delete_many({"resume_id": resume_id}).deleted_count
@@ -0,0 +1,365 @@
+"""
+Storage and serving of resume photos kept in GridFS.
+
+Uploads record their content type on the GridFS file. Downloads stream the
+file chunk by chunk, honour single ``Range`` requests and are marked
+immutable, because a changed photo is always stored under a new id.
+
+After an upload is saved, resized WebP and JPEG variants without EXIF data
+are generated on a background thread. Their ids are kept in the original's
+``metadata.variants`` (for the image view) and in the owning resume's
+``image_variants``.
+
+Uploads are deduplicated by SHA-256: a photo already in GridFS is reused and
+its ``metadata.refcount`` incremented, and a file is only deleted (with its
+variants) once the last resume using it releases it.
+
+Photos under a size threshold skip GridFS altogether and are kept inline on
+the resume as ``image_inline`` (BinData plus content type and digest), so
+they are served from a single document read and can be embedded in retrieve
+responses as data URIs.
+"""
+import base64
+import calendar
+import hashlib
+import io
+import logging
+import mimetypes
+import re
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import gridfs.errors
+from bson import Binary, ObjectId
+from PIL import Image, ImageOps
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from pymongo import ReturnDocument
+
+from .cache import content_digest
+
+logger = logging.getLogger(__name__)
+
+IMAGE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Used while a requested variant is still being generated, so the original is not cached under its URL
+PENDING_VARIANT_CACHE_CONTROL = "public, max-age=60"
+
+# Formats stored for every variant size, with their encoder options
+VARIANT_FORMATS = {
+    "webp": ("image/webp", {"format": "WEBP", "quality": 80, "method": 4}),
+    "jpeg": ("image/jpeg", {"format": "JPEG", "quality": 82, "optimize": True, "progressive": True}),
+}
+
+# Image decoding and encoding is CPU-bound; keep it off the request threads and to a couple of cores
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="image-variants")
+
+# Served for files stored before content types were recorded
+LEGACY_CONTENT_TYPE = "image/png"
+
+_RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+# id of the GridFS file holding an upload, the variants it already has, and whether it was newly written
+StoredImage = namedtuple("StoredImage", ["id", "variants", "created"])
+
+
+class RangeNotSatisfiable(ValueError):
+    pass
+
+
+def image_content_type(uploaded_file):
+    """Content type to store for an upload; anything that is not an image is stored as octet-stream"""
+    content_type = getattr(uploaded_file, "content_type", None)
+    if not content_type or not content_type.startswith("image/"):
+        content_type = mimetypes.guess_type(uploaded_file.name or "")[0]
+    return content_type if content_type and content_type.startswith("image/") else "application/octet-stream"
+
+
+def _without_metadata(data):
+    """Re-encode a small photo without its EXIF block (orientation applied); other data is returned as is"""
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if image.format not in ("JPEG", "PNG", "WEBP") or not image.getexif():
+                return data
+            image_format = image.format
+            image = ImageOps.exif_transpose(image)
+            buffer = io.BytesIO()
+            image.save(buffer, format=image_format, **({"quality": 90} if image_format != "PNG" else {}))
+            return buffer.getvalue()
+    except (Image.DecompressionBombError, OSError, ValueError):
+        return data
+
+
+def inline_image(uploaded_file, max_bytes):
+    """
+    The ``image_inline`` subdocument for an upload of at most ``max_bytes``,
+    or None when it is larger and belongs in GridFS.
+    """
+    if uploaded_file.size > max_bytes:
+        return None
+    data = _without_metadata(uploaded_file.read())
+    return {
+        "data": Binary(data),
+        "content_type": image_content_type(uploaded_file),
+        "filename": uploaded_file.name,
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "uploaded_at": datetime.now(timezone.utc),
+    }
+
+
+class InlineImage(io.BytesIO):
+    """An ``image_inline`` photo, with the GridOut attributes gridfs_response reads"""
+    md5 = None
+    metadata = None
+
+    def __init__(self, image_id, inline):
+        super().__init__(bytes(inline["data"]))
+        self._id = image_id
+        self.length = len(inline["data"])
+        self.content_type = inline["content_type"]
+        self.filename = inline["filename"]
+        self.upload_date = inline["uploaded_at"]
+
+    def readchunk(self):
+        return self.read()
+
+
+def data_uri(inline):
+    return f"data:{inline['content_type']};base64,{base64.b64encode(bytes(inline['data'])).decode('ascii')}"
+
+
+def store_image(fs, files, uploaded_file):
+    """
+    Store an uploaded photo, reusing an identical one already in GridFS.
+
+    The upload is hashed before anything is sent to Mongo, so a repeated
+    photo costs one ``fs.files`` update instead of a full write. ``files`` is
+    the bucket's fs.files collection. Every StoredImage holds one reference
+    that must be given back with release_image.
+    """
+    digest = content_digest(uploaded_file.chunks())
+    existing = files.find_one_and_update(
+        {"metadata.sha256": digest, "metadata.deleting": {"$ne": True}},
+        {"$inc": {"metadata.refcount": 1}},
+        projection={"metadata.variants": 1},
+    )
+    if existing:
+        return StoredImage(existing["_id"], (existing.get("metadata") or {}).get("variants"), False)
+
+    uploaded_file.seek(0)
+    image_id = fs.put(
+        uploaded_file,
+        filename=uploaded_file.name,
+        content_type=image_content_type(uploaded_file),
+        metadata={"sha256": digest, "refcount": 1},
+    )
+    return StoredImage(image_id, None, True)
+
+
+def release_image(fs, files, image_id):
+    """
+    Drop one reference to a stored photo; the last one deletes it and its
+    variants. Files stored before reference counting count as one reference.
+    Returns True if the file was deleted.
+    """
+    image_id = ObjectId(image_id)
+    released = files.find_one_and_update(
+        {"_id": image_id}, {"$inc": {"metadata.refcount": -1}}, return_document=ReturnDocument.AFTER
+    )
+    if released is None or released["metadata"]["refcount"] > 0:
+        return False
+    # Claim the deletion, unless a concurrent upload of the same photo took a new reference meanwhile
+    claimed = files.find_one_and_update(
+        {"_id": image_id, "metadata.refcount": {"$lte": 0}, "metadata.deleting": {"$ne": True}},
+        {"$set": {"metadata.deleting": True}},
+    )
+    if claimed is None:
+        return False
+    _delete_variants(fs, claimed["metadata"].get("variants"))
+    try:
+        fs.delete(image_id)
+    except gridfs.errors.NoFile:
+        pass
+    return True
+
+
+def _prepared(data):
+    """Decode an upload, apply its EXIF orientation and drop everything but the pixels"""
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            flattened = Image.new("RGB", image.size, (255, 255, 255))
+            flattened.paste(image, mask=image.getchannel("A"))
+            return flattened
+        return image.convert("RGB")
+
+
+def generate_variants(fs, image_id, sizes):
+    """
+    Store a resized copy of a GridFS photo per size and format and return
+    ``{str(size): {format: str(file id)}}``. Sizes bound the longest edge;
+    images are never scaled up.
+    """
+    original = fs.get(ObjectId(image_id))
+    image = _prepared(original.read())
+    stem = (original.filename or "image").rsplit(".", 1)[0]
+
+    variants = {}
+    for size in sorted(sizes):
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.LANCZOS)
+        variants[str(size)] = {}
+        for name, (content_type, options) in VARIANT_FORMATS.items():
+            buffer = io.BytesIO()
+            resized.save(buffer, **options)
+            variant_id = fs.put(
+                buffer.getvalue(),
+                filename=f"{stem}-{size}.{name}",
+                content_type=content_type,
+                metadata={"variant_of": str(image_id)},
+            )
+            variants[str(size)][name] = str(variant_id)
+    return variants
+
+
+def _process_variants(fs, files, image_id, resumes, sizes):
+    try:
+        variants = generate_variants(fs, image_id, sizes)
+    except (gridfs.errors.NoFile, Image.DecompressionBombError, OSError, ValueError) as e:
+        logger.warning(f"Could not generate variants of image {image_id}: {str(e)}")
+        return None
+    result = files.update_one(
+        {"_id": ObjectId(image_id), "metadata.deleting": {"$ne": True}},
+        {"$set": {"metadata.variants": variants}},
+    )
+    if not result.matched_count:
+        # The photo was replaced or deleted while it was being processed
+        _delete_variants(fs, variants)
+        return None
+    resumes.update_many({"image_id": str(image_id)}, {"$set": {"image_variants": variants}})
+    return variants
+
+
+def schedule_variants(fs, files, image_id, resumes, sizes):
+    """
+    Generate variants of a stored photo in the background and record them on
+    its GridFS files document (``files`` is the bucket's fs.files collection)
+    and on the resumes using it. Returns the Future.
+    """
+    return _executor.submit(_process_variants, fs, files, str(image_id), resumes, sizes)
+
+
+def _delete_variants(fs, variants):
+    for formats in (variants or {}).values():
+        for variant_id in formats.values():
+            try:
+                fs.delete(ObjectId(variant_id))
+            except gridfs.errors.NoFile:
+                pass
+
+
+def pick_variant(grid_out, size, accept):
+    """
+    Id of the stored variant to serve for ``?size=`` (the smallest at least
+    that large, else the largest) in the best format the Accept header
+    allows, or None when no variants exist yet. Requests without a size get
+    the original.
+    """
+    variants = (grid_out.metadata or {}).get("variants")
+    if not variants:
+        return None
+    sizes = sorted(int(key) for key in variants)
+    chosen = next((candidate for candidate in sizes if candidate >= size), sizes[-1])
+    name = "webp" if "image/webp" in (accept or "") else "jpeg"
+    return variants[str(chosen)][name]
+
+
+def image_validators(grid_out):
+    """ETag from the GridFS md5 when the driver stored one, else the file id and upload date"""
+    last_modified = calendar.timegm(grid_out.upload_date.utctimetuple())
+    md5 = getattr(grid_out, "md5", None)
+    etag = f'"{md5}"' if md5 else f'"{grid_out._id}-{last_modified}"'
+    return etag, last_modified
+
+
+def parse_range(header, length):
+    """
+    Return the inclusive (start, end) byte range a ``Range`` header asks for,
+    or None when the whole file should be sent (no header, several ranges or
+    a malformed one). Raises RangeNotSatisfiable when the range lies past the
+    end of the file.
+    """
+    match = _RANGE_RE.fullmatch(header.strip()) if header else None
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the last N bytes
+        if int(last) == 0:
+            raise RangeNotSatisfiable(header)
+        return max(0, length - int(last)), length - 1
+    start = int(first)
+    end = min(int(last), length - 1) if last else length - 1
+    if start >= length:
+        raise RangeNotSatisfiable(header)
+    return (start, end) if start <= end else None
+
+
+def iter_range(grid_out, start, end):
+    """Yield the bytes start..end (inclusive) of a GridFS file, one chunk at a time"""
+    grid_out.seek(start)
+    remaining = end - start + 1
+    while remaining > 0:
+        data = grid_out.readchunk()
+        if not data:
+            break
+        data = data[:remaining]
+        remaining -= len(data)
+        yield data
+
+
+def _range_applies(request, etag, last_modified):
+    # If-Range: only honour Range while the client's copy is still current
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def gridfs_response(request, grid_out):
+    """Build the response for a GET of a GridFS photo, reading chunks only if the body is sent"""
+    etag, last_modified = image_validators(grid_out)
+    length = int(grid_out.length)
+
+    response = get_conditional_response(request, etag, last_modified)
+    if response is None:
+        byte_range = None
+        if "HTTP_RANGE" in request.META and _range_applies(request, etag, last_modified):
+            try:
+                byte_range = parse_range(request.META["HTTP_RANGE"], length)
+            except RangeNotSatisfiable:
+                response = HttpResponse(status=416)
+                response["Content-Range"] = f"bytes */{length}"
+                return response
+
+        start, end = byte_range or (0, length - 1)
+        content_type = grid_out.content_type or LEGACY_CONTENT_TYPE
+        response = StreamingHttpResponse(iter_range(grid_out, start, end), content_type=content_type)
+        response["Content-Length"] = str(end - start + 1)
+        if byte_range:
+            response.status_code = 206
+            response["Content-Range"] = f"bytes {start}-{end}/{length}"
+        response["Accept-Ranges"] = "bytes"
+        response["Content-Disposition"] = f'inline; filename="{grid_out.filename}"'
+        response["X-Content-Type-Options"] = "nosniff"
+
+    response["Cache-Control"] = IMAGE_CACHE_CONTROL
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    return response
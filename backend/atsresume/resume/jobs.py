@@ -0,0 +1,185 @@
+import logging
+import os
+import threading
+import traceback
+from datetime import datetime, timedelta, timezone
+
+import pymongo
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class ExtractionJobQueue:
+    """
+    Mongo-backed queue for asynchronous resume extraction.
+
+    Jobs are claimed atomically with ``find_one_and_update`` by background
+    threads in each web worker process, so no external broker is needed. The
+    threads are started when a worker boots (see gunicorn.conf.py), so jobs
+    left over from a restart are picked up without waiting for a request. A
+    claimed job holds a lease that is renewed while the job runs; if its
+    worker dies, the job is picked up again once the lease expires, up to
+    ``max_attempts`` times. Finished jobs are
+    removed by a TTL index after ``result_ttl_seconds``.
+    """
+
+    def __init__(self, collection, handler, workers=1, poll_interval=1.0, lease_seconds=120,
+                 max_attempts=3, result_ttl_seconds=24 * 3600):
+        self.collection = collection
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.result_ttl_seconds = result_ttl_seconds
+
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._started_pid = None
+        self._indexed = False
+
+    def enqueue(self, data, file_extension, extractor=None):
+        """Store an upload as a queued job and return its id"""
+        self._ensure_indexes()
+        now = datetime.now(timezone.utc)
+        job_id = str(ObjectId())
+        self.collection.insert_one({
+            "_id": job_id,
+            "status": QUEUED,
+            "file": bytes(data),
+            "file_extension": file_extension,
+            "extractor": extractor,
+            "attempts": 0,
+            "created_at": now,
+            "updated_at": now,
+        })
+        self.start()
+        self._wake.set()
+        return job_id
+
+    def get(self, job_id):
+        """Return a job without its file payload, or None"""
+        return self.collection.find_one({"_id": job_id}, {"file": 0})
+
+    def start(self):
+        """Start the worker threads for this process if they are not running yet"""
+        if self.workers <= 0:
+            return
+        with self._lock:
+            # Threads do not survive a fork, so track the process that started them
+            if self._started_pid == os.getpid():
+                return
+            self._started_pid = os.getpid()
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._run_forever, name=f"extraction-job-{index}", daemon=True)
+                thread.start()
+
+    def process_next(self):
+        """Claim and run one job; return False when there was nothing to do"""
+        job = self._claim()
+        if job is None:
+            return False
+
+        stop = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._renew_lease, args=(job, stop), name=f"extraction-lease-{job['_id']}", daemon=True
+        )
+        heartbeat.start()
+        try:
+            result = self.handler(job["file"], job["file_extension"], job.get("extractor"))
+        except Exception as e:
+            logger.error(f"Extraction job {job['_id']} failed: {traceback.format_exc()}")
+            fields = {"status": FAILED, "error": str(e)}
+        else:
+            fields = {"status": DONE, "result": result}
+        finally:
+            stop.set()
+            heartbeat.join()
+        self._finish(job["_id"], fields)
+        return True
+
+    def _renew_lease(self, job, stop):
+        """Push a running job's lease forward until ``stop`` is set, so a slow extraction is not claimed twice"""
+        while not stop.wait(self.lease_seconds / 3):
+            try:
+                # Only while this attempt still holds the job; once it is claimed again, its new worker renews it
+                self.collection.update_one(
+                    {"_id": job["_id"], "status": RUNNING, "attempts": job.get("attempts")},
+                    {"$set": {"lease_expires_at": datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds)}},
+                )
+            except PyMongoError as e:
+                logger.warning(f"Could not renew the lease on extraction job {job['_id']}: {str(e)}")
+
+    def _claim(self):
+        now = datetime.now(timezone.utc)
+        return self.collection.find_one_and_update(
+            {
+                "$or": [
+                    {"status": QUEUED},
+                    {"status": RUNNING, "lease_expires_at": {"$lt": now}, "attempts": {"$lt": self.max_attempts}},
+                ]
+            },
+            {
+                "$set": {
+                    "status": RUNNING,
+                    "lease_expires_at": now + timedelta(seconds=self.lease_seconds),
+                    "updated_at": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("created_at", pymongo.ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def _fail_abandoned(self):
+        # Jobs whose worker died on every attempt would otherwise stay "running" forever
+        now = datetime.now(timezone.utc)
+        self.collection.update_many(
+            {"status": RUNNING, "lease_expires_at": {"$lt": now}, "attempts": {"$gte": self.max_attempts}},
+            {
+                "$set": {
+                    "status": FAILED,
+                    "error": "Extraction was interrupted too many times",
+                    "updated_at": now,
+                    "expires_at": now + timedelta(seconds=self.result_ttl_seconds),
+                },
+                "$unset": {"file": "", "lease_expires_at": ""},
+            },
+        )
+
+    def _finish(self, job_id, fields):
+        now = datetime.now(timezone.utc)
+        fields.update({
+            "updated_at": now,
+            "expires_at": now + timedelta(seconds=self.result_ttl_seconds),
+        })
+        self.collection.update_one(
+            {"_id": job_id},
+            {"$set": fields, "$unset": {"file": "", "lease_expires_at": ""}},
+        )
+
+    def _run_forever(self):
+        while True:
+            try:
+                if self.process_next():
+                    continue
+                self._fail_abandoned()
+            except PyMongoError as e:
+                logger.warning(f"Extraction job queue unavailable: {str(e)}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _ensure_indexes(self):
+        if self._indexed:
+            return
+        self.collection.create_index([("status", pymongo.ASCENDING), ("created_at", pymongo.ASCENDING)])
+        self.collection.create_index([("expires_at", pymongo.ASCENDING)], expireAfterSeconds=0)
+        self._indexed = True
@@ -0,0 +1,92 @@
+"""
+Incremental parsing of a streamed JSON object, one top-level field at a time.
+
+Gemini streams its JSON answer in arbitrary chunks. TopLevelFieldParser scans
+each chunk once, tracking string and nesting state, and hands back every
+top-level ``key: value`` pair as soon as its value is complete, so sections
+can be forwarded to the client before the rest of the object has arrived.
+"""
+import json
+
+
+def strip_code_fence(text):
+    """Remove the ```json fence Gemini sometimes wraps its answer in"""
+    text = text.strip()
+    if text.startswith("```json") and text.endswith("```"):
+        text = text[7:-3].strip()
+    return text
+
+
+class TopLevelFieldParser:
+    def __init__(self):
+        self.text = ""
+        self.complete = False
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._expect_key = False
+        self._key_start = None
+        self._key = None
+        self._value_start = None
+
+    def feed(self, chunk):
+        """Append a chunk and return the (key, value) pairs it completed, in order"""
+        self.text += chunk
+        fields = []
+        text = self.text
+        for index in range(self._pos, len(text)):
+            char = text[index]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._key_start is not None:
+                        self._key = json.loads(text[self._key_start:index + 1])
+                        self._key_start = None
+                continue
+            if self.complete:
+                break
+
+            if char == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expect_key:
+                    self._key_start = index
+                    self._expect_key = False
+            elif char in "{[":
+                self._depth += 1
+                if self._depth == 1:
+                    self._expect_key = True
+            elif char in "}]":
+                if self._depth == 1:
+                    self._emit(text, index, fields)
+                    self.complete = True
+                self._depth -= 1
+            elif self._depth == 1:
+                if char == ":":
+                    self._value_start = index + 1
+                elif char == ",":
+                    self._emit(text, index, fields)
+                    self._expect_key = True
+        self._pos = len(text)
+        return fields
+
+    def result(self):
+        """Parse everything received as one document; None if it is not valid JSON"""
+        try:
+            return json.loads(strip_code_fence(self.text))
+        except json.JSONDecodeError as e:
+            print(f"Error parsing JSON response: {e}")
+            return None
+
+    def _emit(self, text, end, fields):
+        if self._value_start is None:
+            return
+        try:
+            fields.append((self._key, json.loads(text[self._value_start:end])))
+        except json.JSONDecodeError:
+            pass  # Left to result(), which reports the malformed document
+        self._value_start = None
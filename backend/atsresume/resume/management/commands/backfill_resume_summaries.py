@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from pymongo import UpdateOne
+
+from resume.summary import build_summary
+from resume.views import resume_collection
+
+
+class Command(BaseCommand):
+    help = "Write the denormalized summary on resumes created before it existed"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="updates per bulk_write")
+
+    def handle(self, *args, **options):
+        cursor = resume_collection.find(
+            {"summary": {"$exists": False}}, {"title": 1, "resume_details": 1, "updated_at": 1}
+        )
+        updates, total = [], 0
+        for resume in cursor:
+            summary = build_summary(resume.get("title"), resume.get("resume_details"), resume.get("updated_at"))
+            updates.append(UpdateOne({"_id": resume["_id"]}, {"$set": {"summary": summary}}))
+            if len(updates) >= options["batch_size"]:
+                total += resume_collection.bulk_write(updates, ordered=False).modified_count
+                updates = []
+        if updates:
+            total += resume_collection.bulk_write(updates, ordered=False).modified_count
+        self.stdout.write(f"Backfilled {total} resume summaries")
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+from pymongo.errors import OperationFailure
+
+from db_connection import get_mongo_connection
+from db_indexes import ensure_indexes
+
+
+class Command(BaseCommand):
+    help = "Build the MongoDB indexes declared in db_indexes.py (safe to run repeatedly)"
+
+    def handle(self, *args, **options):
+        try:
+            created = ensure_indexes(get_mongo_connection())
+        except OperationFailure as e:
+            raise CommandError(str(e))
+        for collection, names in created.items():
+            self.stdout.write(f"{collection}: {', '.join(names)}")
@@ -0,0 +1,39 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from resume.bulk import iter_directory
+from resume.views import make_bulk_importer
+
+
+class Command(BaseCommand):
+    help = "Import every PDF/DOC/DOCX resume under a directory, printing JSON progress records per file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory")
+        parser.add_argument("--user-id", help="user_id stored on the imported resumes")
+        parser.add_argument("--workers", type=int, help="files processed concurrently (BULK_IMPORT_WORKERS)")
+        parser.add_argument("--llm-concurrency", type=int,
+                            help="concurrent Gemini calls (BULK_IMPORT_LLM_CONCURRENCY)")
+        parser.add_argument("--llm-batch-size", type=int,
+                            help="resumes packed into one Gemini prompt (BULK_IMPORT_LLM_BATCH_SIZE)")
+        parser.add_argument("--batch-size", type=int, help="resumes per insert_many (BULK_IMPORT_BATCH_SIZE)")
+        parser.add_argument("--results", action="store_true", help="include the parsed data in each record")
+
+    def handle(self, *args, **options):
+        directory = options["directory"]
+        if not os.path.isdir(directory):
+            raise CommandError(f"{directory} is not a directory")
+
+        importer = make_bulk_importer(
+            user_id=options["user_id"],
+            workers=options["workers"],
+            llm_concurrency=options["llm_concurrency"],
+            batch_size=options["batch_size"],
+            llm_batch_size=options["llm_batch_size"],
+        )
+        for record in importer.run(iter_directory(directory)):
+            if not options["results"]:
+                record.pop("result", None)
+            self.stdout.write(json.dumps(record, default=str))
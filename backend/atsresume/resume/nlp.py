@@ -0,0 +1,50 @@
+"""
+Lazily loaded spaCy pipeline used for name extraction.
+
+Only the NER component is loaded. This module has no Django imports so the
+gunicorn master can preload the model before forking (see gunicorn.conf.py)
+and share its weights copy-on-write with every worker.
+"""
+import gc
+import os
+import threading
+
+import spacy
+
+MODEL_NAME = os.getenv("SPACY_MODEL", "en_core_web_sm")
+
+# extract_name only reads doc.ents; en_core_web_sm's ner has its own tok2vec layer
+EXCLUDED_COMPONENTS = ["tok2vec", "tagger", "parser", "senter", "attribute_ruler", "lemmatizer"]
+
+# Names sit at the top of a resume, so NER only needs the first few hundred characters
+NAME_SCAN_CHARS = int(os.getenv("NAME_SCAN_CHARS", 400))
+
+_nlp = None
+_lock = threading.Lock()
+
+
+def get_nlp():
+    """Return the shared NER-only pipeline, loading it on first use"""
+    global _nlp
+    if _nlp is None:
+        with _lock:
+            if _nlp is None:
+                _nlp = spacy.load(MODEL_NAME, exclude=EXCLUDED_COMPONENTS)
+    return _nlp
+
+
+def preload():
+    """Load the pipeline now and move it out of the garbage collector's view so forked workers share it"""
+    get_nlp()
+    gc.collect()
+    gc.freeze()
+
+
+def name_window(text, limit=None):
+    """Return the head of a document, cut at a whitespace boundary, for name extraction"""
+    limit = NAME_SCAN_CHARS if limit is None else limit
+    if len(text) <= limit:
+        return text
+    head = text[:limit]
+    cut = max(head.rfind("\n"), head.rfind(" "))
+    return head[:cut] if cut > 0 else head
@@ -0,0 +1,263 @@
+"""
+JSON Patch (RFC 6902) and JSON Merge Patch (RFC 7386) for resumes.
+
+Patches address the editable part of a resume, ``{"title": ...,
+"resume_details": {...}}``, with JSON pointers such as
+``/resume_details/experience/0/company``. ``json_patch_update`` and
+``merge_patch_update`` turn a patch into one MongoDB update document of
+targeted ``$set``/``$unset``/``$push`` operators. Patches MongoDB cannot
+apply atomically in one update (removing or inserting array elements by
+index, move/copy/test, operations on overlapping paths) raise
+Unrepresentable; those are applied in Python with ``apply_json_patch`` or
+``apply_merge_patch`` and written back with ``section_update``, which sets
+only the sections that changed.
+"""
+import copy
+
+PATCHABLE_FIELDS = ("title", "resume_details")
+JSON_PATCH_OPERATIONS = ("add", "remove", "replace", "move", "copy", "test")
+
+
+class PatchError(ValueError):
+    """The patch document is malformed or would leave an invalid resume"""
+
+
+class PatchConflict(PatchError):
+    """The patch does not apply to the resume as it currently is"""
+
+
+class Unrepresentable(Exception):
+    """The patch cannot be expressed as a single MongoDB update"""
+
+
+def parse_pointer(pointer):
+    """Split a JSON pointer into unescaped tokens, rejecting paths outside the patchable fields"""
+    if not isinstance(pointer, str) or not pointer.startswith("/"):
+        raise PatchError(f"Invalid JSON pointer: {pointer!r}")
+    tokens = [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+    if tokens[0] not in PATCHABLE_FIELDS:
+        raise PatchError(f"Path is not patchable: {pointer}")
+    if tokens[0] == "title" and len(tokens) > 1:
+        raise PatchError("title is a string")
+    for token in tokens:
+        _check_token(token, pointer)
+    return tokens
+
+
+def _check_token(token, pointer):
+    # Tokens become MongoDB field names
+    if not token or "." in token or token.startswith("$"):
+        raise PatchError(f"Unsupported path segment {token!r} in {pointer}")
+
+
+def validate_json_patch(operations):
+    if not isinstance(operations, list):
+        raise PatchError("A JSON Patch must be an array of operations")
+    for operation in operations:
+        if not isinstance(operation, dict) or operation.get("op") not in JSON_PATCH_OPERATIONS:
+            raise PatchError(f"Invalid operation: {operation!r}")
+        if operation["op"] in ("add", "replace", "test") and "value" not in operation:
+            raise PatchError(f"{operation['op']} needs a value")
+        if operation["op"] in ("move", "copy"):
+            parse_pointer(operation.get("from"))
+        parse_pointer(operation.get("path"))
+
+
+def _check_value(tokens, value):
+    if tokens == ["title"] and not isinstance(value, str):
+        raise PatchError("title must be a string")
+    if tokens == ["resume_details"] and not isinstance(value, dict):
+        raise PatchError("resume_details must be an object")
+
+
+def _overlaps(path, other):
+    return path == other or path.startswith(other + ".") or other.startswith(path + ".")
+
+
+def _update_document(sets, unsets, pushes):
+    update = {}
+    if sets:
+        update["$set"] = sets
+    if unsets:
+        update["$unset"] = {path: "" for path in unsets}
+    if pushes:
+        update["$push"] = {path: {"$each": values} for path, values in pushes.items()}
+    return update
+
+
+def json_patch_update(operations):
+    """
+    Translate a validated JSON Patch into ``(conditions, update)``: filter
+    conditions requiring the paths it replaces or removes (and the parents it
+    adds to) to exist, as RFC 6902 does, and one update document. Raises
+    Unrepresentable when no single update can apply it.
+    """
+    conditions, sets, unsets, pushes = {}, {}, [], {}
+    touched = []
+    for operation in operations:
+        tokens = parse_pointer(operation["path"])
+        if operation["op"] in ("move", "copy", "test"):
+            raise Unrepresentable(operation["op"])
+        if len(tokens) == 1 and operation["op"] == "remove":
+            raise PatchError(f"{tokens[0]} cannot be removed")
+
+        last = tokens[-1]
+        if operation["op"] == "add" and last == "-":
+            path = ".".join(tokens[:-1])
+            conditions[path] = {"$type": "array"}
+        elif last.isdigit() and operation["op"] != "replace":
+            # Inserting or removing at an index shifts the array; not expressible with field operators
+            raise Unrepresentable(operation["path"])
+        else:
+            path = ".".join(tokens)
+            if operation["op"] != "add":
+                conditions[path] = {"$exists": True}
+            elif len(tokens) > 2:
+                conditions[".".join(tokens[:-1])] = {"$exists": True}
+        appended = path + ".-" if last == "-" else None
+        if any(_overlaps(path, other) for other in touched if other != appended):
+            raise Unrepresentable(operation["path"])
+
+        if operation["op"] == "remove":
+            unsets.append(path)
+        elif last == "-":
+            # Several appends to one array combine into one $push
+            pushes.setdefault(path, []).append(operation["value"])
+            touched.append(appended)
+            continue
+        else:
+            _check_value(tokens, operation["value"])
+            sets[path] = operation["value"]
+        touched.append(path)
+    return conditions, _update_document(sets, unsets, pushes)
+
+
+def merge_patch_update(patch):
+    """Translate a merge patch into one update document, or raise Unrepresentable"""
+    if not isinstance(patch, dict):
+        raise PatchError("A merge patch must be an object")
+    sets, unsets = {}, []
+
+    def walk(tokens, value):
+        _check_token(tokens[-1], "/" + "/".join(tokens))
+        if value is None:
+            if len(tokens) == 1:
+                raise PatchError(f"{tokens[0]} cannot be removed")
+            unsets.append(".".join(tokens))
+        elif isinstance(value, dict) and tokens != ["title"]:
+            if not value:
+                # Turns a non-object member into {}; only knowable against the document
+                raise Unrepresentable("/" + "/".join(tokens))
+            for key, member in value.items():
+                walk(tokens + [key], member)
+        else:
+            _check_value(tokens, value)
+            sets[".".join(tokens)] = value
+
+    for key, value in patch.items():
+        if key not in PATCHABLE_FIELDS:
+            raise PatchError(f"Field is not patchable: {key}")
+        walk([key], value)
+    return _update_document(sets, unsets, {})
+
+
+def _child(container, token, pointer):
+    if isinstance(container, dict) and token in container:
+        return container[token]
+    if isinstance(container, list) and token.isdigit() and int(token) < len(container):
+        return container[int(token)]
+    raise PatchConflict(f"Path not found: {pointer}")
+
+
+def _resolve(document, tokens, pointer):
+    for token in tokens:
+        document = _child(document, token, pointer)
+    return document
+
+
+def _add(document, tokens, value, pointer):
+    parent = _resolve(document, tokens[:-1], pointer)
+    last = tokens[-1]
+    if isinstance(parent, dict):
+        parent[last] = value
+    elif isinstance(parent, list) and last == "-":
+        parent.append(value)
+    elif isinstance(parent, list) and last.isdigit() and int(last) <= len(parent):
+        parent.insert(int(last), value)
+    else:
+        raise PatchConflict(f"Cannot add at {pointer}")
+
+
+def _remove(document, tokens, pointer):
+    parent = _resolve(document, tokens[:-1], pointer)
+    _child(parent, tokens[-1], pointer)
+    if isinstance(parent, dict):
+        return parent.pop(tokens[-1])
+    return parent.pop(int(tokens[-1]))
+
+
+def apply_json_patch(document, operations):
+    """Apply a validated JSON Patch to a copy of ``document`` with RFC 6902 semantics"""
+    document = copy.deepcopy(document)
+    for operation in operations:
+        pointer = operation["path"]
+        tokens = parse_pointer(pointer)
+        kind = operation["op"]
+        if kind == "test":
+            if _resolve(document, tokens, pointer) != operation["value"]:
+                raise PatchConflict(f"Test failed at {pointer}")
+            continue
+        if kind == "remove" and len(tokens) == 1:
+            raise PatchError(f"{tokens[0]} cannot be removed")
+        if kind == "remove":
+            _remove(document, tokens, pointer)
+        elif kind == "replace":
+            _remove(document, tokens, pointer)
+            _add(document, tokens, copy.deepcopy(operation["value"]), pointer)
+        elif kind == "add":
+            _add(document, tokens, copy.deepcopy(operation["value"]), pointer)
+        else:
+            source = parse_pointer(operation["from"])
+            if kind == "move" and len(source) == 1:
+                raise PatchError(f"{source[0]} cannot be removed")
+            if kind == "move" and tokens[:len(source)] == source and tokens != source:
+                raise PatchError(f"Cannot move {operation['from']} into itself")
+            value = _resolve(document, source, operation["from"])
+            if kind == "move":
+                _remove(document, source, operation["from"])
+            _add(document, tokens, copy.deepcopy(value), pointer)
+    return document
+
+
+def apply_merge_patch(target, patch):
+    """Apply a merge patch to a copy of ``target`` with RFC 7386 semantics"""
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    result = copy.deepcopy(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = apply_merge_patch(result.get(key), value)
+    return result
+
+
+def section_update(before, after):
+    """
+    Update document that turns ``before`` into ``after`` by setting the title
+    and each changed top-level section of resume_details.
+    """
+    _check_value(["title"], after.get("title"))
+    _check_value(["resume_details"], after.get("resume_details"))
+    sets, unsets = {}, []
+    if before.get("title") != after["title"]:
+        sets["title"] = after["title"]
+    old, new = before.get("resume_details") or {}, after["resume_details"]
+    if not isinstance(old, dict):
+        sets["resume_details"] = new
+    else:
+        for key in new:
+            if key not in old or old[key] != new[key]:
+                sets[f"resume_details.{key}"] = new[key]
+        unsets.extend(f"resume_details.{key}" for key in old if key not in new)
+    return _update_document(sets, unsets, {})
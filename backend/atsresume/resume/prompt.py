@@ -0,0 +1,201 @@
+"""
+Prompt compiler for Gemini resume parsing.
+
+Extracted text is cleaned before it is sent: Unicode is normalized, ligatures
+and hyphenated line breaks are repaired, page numbers and repeated
+header/footer lines are dropped. The text is then trimmed to a token budget,
+lowest-value lines first, and wrapped in a compact schema prompt.
+"""
+import json
+import os
+import re
+import unicodedata
+from collections import Counter, namedtuple
+
+from .scanner import heading_section
+
+# Resume text beyond this many (estimated) tokens is trimmed before sending
+DEFAULT_TOKEN_BUDGET = int(os.getenv("GEMINI_PROMPT_TOKEN_BUDGET", 6000))
+
+# Resume text per batched prompt. The JSON answer is roughly as long as the input, so this also
+# keeps a batch's answer under the model's output token limit
+DEFAULT_BATCH_TOKEN_BUDGET = int(os.getenv("GEMINI_BATCH_TOKEN_BUDGET", 4000))
+
+# Gemini tokenizers average roughly four characters per token on English text
+CHARS_PER_TOKEN = 4
+
+SCHEMA = {
+    "personal": {"name": "", "email": "", "phone": "", "address": "", "summary": None},
+    "skills": [""],
+    "experience": [{"jobTitle": "", "company": "", "startDate": "", "endDate": None, "location": "", "tasks": [""]}],
+    "projects": [{"name": "", "tasks": [""], "technologies": [""]}],
+    "education": [{"institution": "", "graduation_date": "", "course": "", "location": ""}],
+}
+COMPACT_SCHEMA = json.dumps(SCHEMA, separators=(",", ":"))
+
+INSTRUCTIONS = (
+    "Return only JSON for the resume below, shaped like this schema. "
+    "Use null when a value is missing. phone: 10 digits. Dates: MM/YYYY, endDate null if current. "
+    "tasks: one string per bullet."
+)
+
+BATCH_INSTRUCTIONS = (
+    "Each <resume id=N> block below is a separate resume. Return only a JSON object that maps every id "
+    "to that resume's JSON, shaped like this schema. Use null when a value is missing. phone: 10 digits. "
+    "Dates: MM/YYYY, endDate null if current. tasks: one string per bullet."
+)
+
+PromptParts = namedtuple("PromptParts", ["prompt", "text", "estimated_tokens", "trimmed_lines"])
+
+# NFKC expands the ligature code points (U+FB00-FB06); these are the invisible or odd glyphs it leaves alone
+_REPLACEMENTS = {"\u00ad": "", "\u200b": "", "\u200c": "", "\u200d": "", "\ufeff": "", "\u2010": "-", "\u2011": "-"}
+_REPLACEMENTS_RE = re.compile("|".join(map(re.escape, _REPLACEMENTS)))
+# Form feeds (\x0c) are kept as page breaks
+_CONTROL_RE = re.compile(r"[\x00-\x08\x0b\x0d-\x1f\x7f\ufffd]")
+_HYPHEN_BREAK_RE = re.compile(r"(\w)-\n(\w)")
+_SPACES_RE = re.compile(r"[ \t]+")
+_PAGE_NUMBER_RE = re.compile(r"(?:page\s*)?\d{1,3}(?:\s*(?:of|/)\s*\d{1,3})?|-\s*\d{1,3}\s*-", re.IGNORECASE)
+_DIGITS_RE = re.compile(r"\d+")
+_BULLET_RE = re.compile(r"^[-•*▪◦‣●]\s*")
+
+# Lines within this many lines of a page's top or bottom, repeated (ignoring digits) at the edge
+# of at least REPEATED_LINE_MIN_COUNT pages, are treated as page headers/footers
+PAGE_EDGE_LINES = 2
+REPEATED_LINE_MIN_COUNT = 2
+REPEATED_LINE_MIN_CHARS = 15
+
+
+def estimate_tokens(text):
+    """Cheap local token estimate, used to budget prompts without a count_tokens round trip"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def clean_text(text):
+    """Normalize extracted resume text and drop page artifacts; line structure is kept"""
+    text = unicodedata.normalize("NFKC", text)
+    text = _REPLACEMENTS_RE.sub(lambda match: _REPLACEMENTS[match.group(0)], text)
+    text = _CONTROL_RE.sub("", text.replace("\r\n", "\n"))
+    text = _HYPHEN_BREAK_RE.sub(r"\1\2", text)
+
+    # Pages are separated by form feeds. Running headers/footers are told apart from repeated
+    # content, such as two jobs with the same date range, by sitting at the edge of several pages
+    pages = []
+    for page in text.split("\f"):
+        lines = [_SPACES_RE.sub(" ", line).strip() for line in page.split("\n")]
+        pages.append([line for line in lines if line and not _PAGE_NUMBER_RE.fullmatch(line)])
+
+    edge_counts = Counter()
+    for lines in pages:
+        edge_counts.update({_shape(line) for line in _page_edges(lines) if len(line) >= REPEATED_LINE_MIN_CHARS})
+    seen = set()
+    cleaned = []
+    for lines in pages:
+        for index, line in enumerate(lines):
+            shape = _shape(line)
+            if edge_counts[shape] >= REPEATED_LINE_MIN_COUNT and _at_edge(index, len(lines)):
+                # Keep the first occurrence only
+                if shape in seen:
+                    continue
+                seen.add(shape)
+            cleaned.append(line)
+    return "\n".join(cleaned)
+
+
+def _shape(line):
+    return _DIGITS_RE.sub("#", line)
+
+
+def _at_edge(index, count):
+    return index < PAGE_EDGE_LINES or index >= count - PAGE_EDGE_LINES
+
+
+def _page_edges(lines):
+    return [line for index, line in enumerate(lines) if _at_edge(index, len(lines))]
+
+
+def _trim_order(lines):
+    """Indexes of lines in the order they may be dropped: unscored sections, then bullets bottom-up"""
+    sections = []
+    current = "header"
+    for line in lines:
+        section = heading_section(line)
+        if section:
+            current = section
+            sections.append(None)  # Headings themselves are never dropped
+        else:
+            sections.append(current)
+
+    indexes = range(len(lines) - 1, -1, -1)
+    other = [i for i in indexes if sections[i] == "other"]
+    bullets = [i for i in indexes if sections[i] in ("projects", "experience") and _BULLET_RE.match(lines[i])]
+    summary = [i for i in indexes if sections[i] == "summary"]
+    return other + bullets + summary
+
+
+def trim_to_budget(text, budget_tokens):
+    """Drop the lowest-value lines until the text fits ``budget_tokens``; return (text, dropped line count)"""
+    if estimate_tokens(text) <= budget_tokens:
+        return text, 0
+    lines = text.split("\n")
+    budget_chars = budget_tokens * CHARS_PER_TOKEN
+    size = len(text)
+    dropped = set()
+    for index in _trim_order(lines):
+        if size <= budget_chars:
+            break
+        dropped.add(index)
+        size -= len(lines[index]) + 1
+    kept = "\n".join(line for index, line in enumerate(lines) if index not in dropped)
+    # Still over budget with nothing optional left: cut at a line boundary
+    if len(kept) > budget_chars:
+        kept = kept[:budget_chars].rsplit("\n", 1)[0]
+    return kept, len(dropped)
+
+
+def schema_for(fields):
+    """The part of SCHEMA covering the dotted field paths in ``fields``, such as personal.email or skills"""
+    schema = {}
+    for field in fields:
+        section, _, key = field.partition(".")
+        if key:
+            schema.setdefault(section, {})[key] = SCHEMA[section][key]
+        else:
+            schema[section] = SCHEMA[section]
+    return schema
+
+
+def compile_prompt(text, budget_tokens=None, fields=None):
+    """Build the Gemini parsing prompt for extracted resume text, asking only for ``fields`` when given"""
+    budget_tokens = DEFAULT_TOKEN_BUDGET if budget_tokens is None else budget_tokens
+    cleaned, trimmed = trim_to_budget(clean_text(text), budget_tokens)
+    schema = COMPACT_SCHEMA if fields is None else json.dumps(schema_for(fields), separators=(",", ":"))
+    prompt = f"{INSTRUCTIONS}\nSchema:{schema}\nResume:\n{cleaned}"
+    return PromptParts(prompt, cleaned, estimate_tokens(prompt), trimmed)
+
+
+def pack_batches(texts, batch_size, budget_tokens=None):
+    """
+    Clean resume texts and group them, in order, into batches of at most
+    ``batch_size`` whose combined text fits ``budget_tokens``. Yields lists of
+    (input index, cleaned text); a resume too large to share a prompt is
+    yielded on its own.
+    """
+    budget_tokens = DEFAULT_BATCH_TOKEN_BUDGET if budget_tokens is None else budget_tokens
+    batch = []
+    used = 0
+    for index, text in enumerate(texts):
+        cleaned, _ = trim_to_budget(clean_text(text), DEFAULT_TOKEN_BUDGET)
+        tokens = estimate_tokens(cleaned)
+        if batch and (len(batch) >= batch_size or used + tokens > budget_tokens):
+            yield batch
+            batch, used = [], 0
+        batch.append((index, cleaned))
+        used += tokens
+    if batch:
+        yield batch
+
+
+def compile_batch_prompt(documents):
+    """Build one prompt for several cleaned resumes, given as (id, text) pairs"""
+    blocks = "\n".join(f"<resume id={doc_id}>\n{text}\n</resume>" for doc_id, text in documents)
+    return f"{BATCH_INSTRUCTIONS}\nSchema:{COMPACT_SCHEMA}\n{blocks}"
@@ -0,0 +1,97 @@
+"""
+Single-pass scanner for the rule-based resume fields.
+
+``scan`` walks the text line by line exactly once and collects the email,
+phone number and section contents together, with every pattern compiled at
+import time. The extract_* helpers in resume.utils and the local parser in
+resume.tiered are thin views over its result.
+"""
+import os
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+import phonenumbers
+
+# Numbers written without a country code are parsed as belonging to this region
+DEFAULT_PHONE_REGION = os.getenv("PHONE_DEFAULT_REGION", "US")
+
+SECTION_HEADINGS = {
+    "summary": {"summary", "professional summary", "profile", "professional profile", "objective",
+                "career objective", "about me"},
+    "skills": {"skills", "technical skills", "key skills", "core competencies", "skills and tools",
+               "technologies", "technical expertise"},
+    "experience": {"experience", "work experience", "professional experience", "employment history",
+                   "work history", "employment", "relevant experience"},
+    "education": {"education", "academic background", "education and training", "academics"},
+    "projects": {"projects", "personal projects", "academic projects", "key projects", "selected projects"},
+    "other": {"certifications", "certificates", "awards", "achievements", "interests", "hobbies", "references",
+              "languages", "volunteer experience", "volunteering", "publications", "activities"},
+}
+_HEADING_LOOKUP = {heading: section for section, headings in SECTION_HEADINGS.items() for heading in headings}
+# Longest heading above plus room for decoration such as "SKILLS:" or "— Projects —"
+_MAX_HEADING_CHARS = max(len(heading) for heading in _HEADING_LOOKUP) + 8
+
+_HEADING_STRIP_RE = re.compile(r"[^a-z& ]+")
+_EMAIL_RE = re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
+_PHONE_RE = re.compile(r"\+?\(?\d[\d ().-]{8,16}\d")
+
+ResumeScan = namedtuple("ResumeScan", ["first_line", "email", "phone", "sections"])
+
+
+def heading_section(line):
+    """Return the section a stripped line is a heading for, or None"""
+    if len(line) > _MAX_HEADING_CHARS:
+        return None
+    key = _HEADING_STRIP_RE.sub("", line.lower().replace("&", " and "))
+    return _HEADING_LOOKUP.get(" ".join(key.split()))
+
+
+@lru_cache(maxsize=4096)
+def parse_phone(candidate, region=DEFAULT_PHONE_REGION):
+    """Return a phone candidate in international format if it is a valid number, else None"""
+    try:
+        number = phonenumbers.parse(candidate, None if candidate.startswith("+") else region)
+    except phonenumbers.NumberParseException:
+        return None
+    if not phonenumbers.is_valid_number(number):
+        return None
+    return phonenumbers.format_number(number, phonenumbers.PhoneNumberFormat.INTERNATIONAL)
+
+
+def scan(text, region=DEFAULT_PHONE_REGION):
+    """
+    Scan resume text once and return a ResumeScan.
+
+    ``sections`` maps "header" (the lines before the first heading) and every
+    section found to its non-empty, stripped lines. ``email`` and ``phone``
+    are the first valid matches in the document.
+    """
+    first_line = email = phone = None
+    sections = {"header": []}
+    current = sections["header"]
+
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+        if first_line is None:
+            first_line = line
+
+        section = heading_section(line)
+        if section:
+            current = sections.setdefault(section, [])
+            continue
+        current.append(line)
+
+        if email is None and "@" in line:
+            match = _EMAIL_RE.search(line)
+            if match:
+                email = match.group(0)
+        if phone is None:
+            for match in _PHONE_RE.finditer(line):
+                phone = parse_phone(match.group(0).strip(), region)
+                if phone:
+                    break
+
+    return ResumeScan(first_line, email, phone, sections)
@@ -0,0 +1,76 @@
+"""
+Denormalized resume summaries for list views.
+
+Every resume document carries a small ``summary`` subdocument so dashboards
+can list a user's resumes with a projection instead of loading every
+``resume_details``. It is written on create and bulk import and refreshed on
+every update; patches adjust only the parts they touch.
+"""
+from datetime import datetime, timezone
+
+# Sections whose entry counts are shown on resume cards
+COUNTED_SECTIONS = ("experience", "education", "projects", "skills")
+
+# Top-level fields returned by ?view=summary
+SUMMARY_PROJECTION = {"_id": 1, "user_id": 1, "title": 1, "email": 1, "image_id": 1, "summary": 1}
+
+
+def _name(resume_details):
+    personal = resume_details.get("personal") if isinstance(resume_details, dict) else None
+    return personal.get("name") if isinstance(personal, dict) else None
+
+
+def section_counts(resume_details):
+    if not isinstance(resume_details, dict):
+        return {section: 0 for section in COUNTED_SECTIONS}
+    return {
+        section: len(resume_details[section]) if isinstance(resume_details.get(section), list) else 0
+        for section in COUNTED_SECTIONS
+    }
+
+
+def build_summary(title, resume_details, updated_at=None):
+    """Return the summary subdocument for a resume"""
+    return {
+        "title": title or "",
+        "name": _name(resume_details),
+        "updated_at": updated_at or datetime.now(timezone.utc),
+        "counts": section_counts(resume_details),
+    }
+
+
+def summary_updates(update_fields, updated_at=None):
+    """
+    Dotted $set entries that keep ``summary`` in step with an update touching
+    ``update_fields`` (a dict of top-level resume fields being set).
+    """
+    updated_at = updated_at or datetime.now(timezone.utc)
+    updates = {"updated_at": updated_at, "summary.updated_at": updated_at}
+    if "title" in update_fields:
+        updates["summary.title"] = update_fields["title"] or ""
+    if "resume_details" in update_fields:
+        updates["summary.name"] = _name(update_fields["resume_details"])
+        updates["summary.counts"] = section_counts(update_fields["resume_details"])
+    return updates
+
+
+def patch_summary_updates(update, updated_at=None):
+    """
+    ($set, $inc) entries that keep ``summary`` in step with a targeted update
+    document on dotted ``resume_details`` paths, as built by resume.patch.
+    """
+    sets = {key: value for key, value in update.get("$set", {}).items() if "." not in key}
+    updates = summary_updates(sets, updated_at)
+    increments = {}
+    changes = list(update.get("$set", {}).items()) + [(path, None) for path in update.get("$unset", {})]
+    for path, value in changes:
+        if path == "resume_details.personal":
+            updates["summary.name"] = _name({"personal": value})
+        elif path == "resume_details.personal.name":
+            updates["summary.name"] = value
+        elif path.startswith("resume_details.") and path.split(".", 1)[1] in COUNTED_SECTIONS:
+            updates[f"summary.counts.{path.split('.', 1)[1]}"] = len(value) if isinstance(value, list) else 0
+    for path, push in update.get("$push", {}).items():
+        if path.startswith("resume_details.") and path.split(".", 1)[1] in COUNTED_SECTIONS:
+            increments[f"summary.counts.{path.split('.', 1)[1]}"] = len(push["$each"])
+    return updates, increments
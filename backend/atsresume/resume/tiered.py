@@ -0,0 +1,408 @@
+"""
+Tiered resume parsing: the local spaCy/regex parser runs first and Gemini is
+only consulted for the fields (or whole documents) it is not confident about.
+"""
+import copy
+import logging
+import queue
+import re
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from .scanner import scan
+from .utils import extract_name
+
+logger = logging.getLogger(__name__)
+
+ParseOutcome = namedtuple("ParseOutcome", ["data", "confidence", "tier"])
+TieredPlan = namedtuple("TieredPlan", ["data", "confidence", "low_fields", "tier"])
+
+# Escalation is decided on these fields; the others are optional in most resumes
+REQUIRED_FIELDS = ["personal.name", "personal.email", "personal.phone", "skills", "experience", "education"]
+
+_MONTHS = {m: i for i, m in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], 1)}
+_DATE = r"(?:(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s+\d{4}|\d{1,2}/\d{4}|\d{4})"
+_DATE_RE = re.compile(_DATE, re.IGNORECASE)
+_RANGE_RE = re.compile(
+    rf"\(?\s*({_DATE})\s*(?:-|–|—|to)\s*({_DATE}|present|current|now)\s*\)?", re.IGNORECASE
+)
+_BULLET_RE = re.compile(r"^\s*[-•*▪◦‣●]\s*")
+_SPLIT_RE = re.compile(r"\s+[-–—|@]\s+|\s+at\s+|,\s*")
+_SKILL_SPLIT_RE = re.compile(r"[,|•;·]")
+_DEGREE_RE = re.compile(
+    r"\b(b\.?\s?sc|m\.?\s?sc|b\.?\s?tech|m\.?\s?tech|b\.?\s?eng|m\.?\s?eng|b\.?a\b|m\.?a\b|bachelor|master|"
+    r"ph\.?\s?d|diploma|associate|certificate|mba|b\.?e\b|m\.?s\b|b\.?s\b)",
+    re.IGNORECASE,
+)
+_INSTITUTION_RE = re.compile(r"\b(university|college|institute|school|academy|polytechnic)\b", re.IGNORECASE)
+_POSTAL_RE = re.compile(r"\b([A-Z]\d[A-Z]\s?\d[A-Z]\d|\d{5}(-\d{4})?|[A-Z]{2})\b")
+_TECH_LABEL_RE = re.compile(r"^(technologies|tech stack|tech|tools|built with)\s*:\s*", re.IGNORECASE)
+_NAME_LINE_RE = re.compile(r"[A-Z][a-zA-Z'.-]+(\s+[A-Z][a-zA-Z'.-]+){1,3}")
+_CITY_LINE_RE = re.compile(r"[A-Z][\w .'-]+,\s*[A-Z][\w .'-]+")
+_NON_DIGIT_RE = re.compile(r"\D")
+
+# Threads mostly wait on Gemini. Bulk imports pass their own executor so they cannot queue
+# interactive uploads behind them
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="tiered-llm")
+
+
+def _normalize_date(token):
+    token = token.strip().lower()
+    if token in ("present", "current", "now"):
+        return None
+    if "/" in token:
+        month, year = token.split("/")
+        return f"{int(month):02d}/{year}"
+    parts = token.replace(".", "").split()
+    if len(parts) == 2:
+        return f"{_MONTHS[parts[0][:3]]:02d}/{parts[1]}"
+    return token
+
+
+def _is_bullet(line):
+    return bool(_BULLET_RE.match(line))
+
+
+def _group_entries(lines):
+    """Group section lines into entries: up to two header lines followed by bullet points"""
+    entries = []
+    current = None
+    for line in lines:
+        if _is_bullet(line):
+            if current is None:
+                current = {"header": [], "bullets": []}
+                entries.append(current)
+            current["bullets"].append(_BULLET_RE.sub("", line).strip())
+        elif current is not None and not current["bullets"] and len(current["header"]) < 2:
+            current["header"].append(line)
+        else:
+            current = {"header": [line], "bullets": []}
+            entries.append(current)
+    return entries
+
+
+def _parse_experience(lines):
+    jobs = []
+    confidences = []
+    for entry in _group_entries(lines):
+        header = " | ".join(entry["header"])
+        match = _RANGE_RE.search(header)
+        start = end = None
+        if match:
+            start = _normalize_date(match.group(1))
+            end = _normalize_date(match.group(2))
+            header = (header[:match.start()] + header[match.end():]).strip(" |-–—,")
+        parts = [part.strip(" ()") for part in _SPLIT_RE.split(header) if part.strip(" ()")]
+        job = {
+            "jobTitle": parts[0] if parts else "",
+            "company": parts[1] if len(parts) > 1 else "",
+            "startDate": start or "",
+            "endDate": end,
+            "location": parts[2] if len(parts) > 2 else "",
+            "tasks": entry["bullets"],
+        }
+        jobs.append(job)
+        if job["jobTitle"] and job["company"] and job["startDate"]:
+            confidences.append(0.85)
+        elif job["jobTitle"] and job["startDate"]:
+            confidences.append(0.6)
+        else:
+            confidences.append(0.3)
+    return jobs, (min(confidences) if confidences else 0.2)
+
+
+def _parse_education(lines):
+    schools = []
+    confidences = []
+    for entry in _group_entries(lines):
+        header = " | ".join(entry["header"] + entry["bullets"])
+        dates = _DATE_RE.findall(header)
+        remainder = _DATE_RE.sub("", header)
+        parts = [part.strip(" ()") for part in _SPLIT_RE.split(remainder) if part.strip(" ()")]
+        institution = next((part for part in parts if _INSTITUTION_RE.search(part)), "")
+        course = next((part for part in parts if _DEGREE_RE.search(part) and part != institution), "")
+        others = [part for part in parts if part not in (institution, course)]
+        schools.append({
+            "institution": institution,
+            "graduation_date": _normalize_date(dates[-1]) if dates else "",
+            "course": course,
+            "location": others[0] if others else "",
+        })
+        confidences.append(0.85 if institution and (course or dates) else 0.4)
+    return schools, (min(confidences) if confidences else 0.2)
+
+
+def _parse_projects(lines):
+    projects = []
+    for entry in _group_entries(lines):
+        header = " | ".join(entry["header"])
+        technologies = []
+        tasks = []
+        for bullet in entry["bullets"]:
+            if _TECH_LABEL_RE.match(bullet):
+                technologies += _split_list(_TECH_LABEL_RE.sub("", bullet))
+            else:
+                tasks.append(bullet)
+        name, _, tech = header.partition("|")
+        technologies += _split_list(tech)
+        projects.append({"name": _RANGE_RE.sub("", name).strip(" -–—"), "tasks": tasks, "technologies": technologies})
+    return projects, (0.8 if projects else 0.7)
+
+
+def _split_list(text):
+    items = []
+    for item in _SKILL_SPLIT_RE.split(text):
+        item = _BULLET_RE.sub("", item).strip()
+        if ":" in item:
+            item = item.split(":", 1)[1].strip()
+        if item:
+            items.append(item)
+    return items
+
+
+def _parse_skills(lines):
+    skills = []
+    for line in lines:
+        for skill in _split_list(line):
+            if skill not in skills:
+                skills.append(skill)
+    if len(skills) >= 3:
+        return skills, 0.9
+    return skills, (0.6 if skills else 0.2)
+
+
+def _parse_personal(text, scanned):
+    confidence = {}
+    header = scanned.sections["header"]
+    head_lines = header[:3]
+
+    name = extract_name(text)
+    if name and any(name in line for line in head_lines):
+        confidence["personal.name"] = 0.9
+    elif name:
+        confidence["personal.name"] = 0.6
+    elif head_lines and _NAME_LINE_RE.fullmatch(head_lines[0]):
+        name = head_lines[0]
+        confidence["personal.name"] = 0.6
+    else:
+        confidence["personal.name"] = 0.0
+
+    email = scanned.email
+    confidence["personal.email"] = 0.95 if email else 0.3
+
+    phone = scanned.phone
+    if phone:
+        phone = _NON_DIGIT_RE.sub("", phone)[-10:]  # Same 10-digit format the Gemini prompt asks for
+    confidence["personal.phone"] = 0.9 if phone else 0.4
+
+    address = next(
+        (line for line in header[:8]
+         if "," in line and "@" not in line and _POSTAL_RE.search(line) and line != name),
+        None,
+    )
+    if address is None:
+        address = next((line for line in header[1:6] if _CITY_LINE_RE.fullmatch(line)), None)
+    confidence["personal.address"] = 0.7 if address else 0.6
+
+    return {
+        "name": name or "",
+        "email": email or "",
+        "phone": phone or "",
+        "address": address or "",
+        "summary": None,
+    }, confidence
+
+
+def parse_resume_local(text):
+    """
+    Parse a resume with local extractors only, in the same JSON schema the
+    Gemini prompt produces. Returns (data, confidence) where confidence maps
+    dotted field paths to scores between 0 and 1.
+    """
+    scanned = scan(text)
+    sections = scanned.sections
+    personal, confidence = _parse_personal(text, scanned)
+
+    summary = sections.get("summary")
+    personal["summary"] = " ".join(summary) if summary else None
+    confidence["personal.summary"] = 0.85 if summary else 0.6
+
+    skills, confidence["skills"] = _parse_skills(sections.get("skills", []))
+    experience, confidence["experience"] = _parse_experience(sections.get("experience", []))
+    education, confidence["education"] = _parse_education(sections.get("education", []))
+    projects, confidence["projects"] = _parse_projects(sections.get("projects", []))
+
+    data = {
+        "personal": personal,
+        "skills": skills,
+        "experience": experience,
+        "projects": projects,
+        "education": education,
+    }
+    return data, confidence
+
+
+def _get_path(data, path):
+    for key in path.split("."):
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+def _set_path(data, path, value):
+    keys = path.split(".")
+    for key in keys[:-1]:
+        data = data.setdefault(key, {})
+    data[keys[-1]] = value
+
+
+def plan_tiered_parse(text, threshold=0.75):
+    """
+    Parse locally and decide how much of the document the LLM has to parse:
+
+    - the mean confidence of the required fields is below ``threshold``: the
+      LLM result is used for the whole document ("llm")
+    - only some required fields are below ``threshold``: those fields are
+      taken from the LLM result, the rest stay local ("merged")
+    - otherwise the LLM is not needed at all ("local")
+    """
+    data, confidence = parse_resume_local(text)
+    document_confidence = sum(confidence[field] for field in REQUIRED_FIELDS) / len(REQUIRED_FIELDS)
+    low_fields = [field for field in REQUIRED_FIELDS if confidence[field] < threshold]
+
+    if not low_fields and document_confidence >= threshold:
+        tier = "local"
+    elif document_confidence < threshold:
+        tier = "llm"
+    else:
+        tier = "merged"
+    return TieredPlan(data, confidence, low_fields, tier)
+
+
+def _merge_fields(data, fields, llm_data):
+    """Copy ``fields`` from the LLM's answer into ``data``, keeping the local value wherever the LLM left it empty"""
+    for field in fields:
+        value = _get_path(llm_data, field)
+        if value not in (None, "", [], {}):
+            _set_path(data, field, value)
+
+
+def _llm_kwargs(plan):
+    # A merged parse only needs the low-confidence fields, so the LLM is asked for just those
+    return {"fields": plan.low_fields} if plan.tier == "merged" else {}
+
+
+def apply_llm_result(plan, llm_data):
+    """Combine a plan with the LLM's answer; anything but a dict falls back to the local result"""
+    if not isinstance(llm_data, dict):
+        return ParseOutcome(plan.data, plan.confidence, "fallback")
+    if plan.tier == "llm":
+        return ParseOutcome(llm_data, plan.confidence, "llm")
+    _merge_fields(plan.data, plan.low_fields, llm_data)
+    return ParseOutcome(plan.data, plan.confidence, "merged")
+
+
+def parse_resume_tiered(text, llm, threshold=0.75, llm_timeout=30.0, executor=None):
+    """
+    Parse locally and escalate to ``llm`` only where confidence is low (see
+    plan_tiered_parse). For a merged parse ``llm`` is called as
+    ``llm(text, fields=low_fields)`` and only has to answer those fields; a
+    field it leaves empty keeps its local value. If the LLM does not answer
+    within ``llm_timeout`` seconds, raises, or returns nothing usable, the
+    local result is returned ("fallback"). The LLM is called on ``executor``,
+    by default a pool shared by interactive requests.
+    """
+    plan = plan_tiered_parse(text, threshold)
+    if plan.tier == "local":
+        return ParseOutcome(plan.data, plan.confidence, "local")
+
+    future = (executor or _executor).submit(llm, text, **_llm_kwargs(plan))
+    try:
+        llm_data = future.result(timeout=llm_timeout)
+    except FutureTimeout:
+        logger.warning(f"LLM parse timed out after {llm_timeout}s; using local parse")
+        return ParseOutcome(plan.data, plan.confidence, "fallback")
+    except Exception as e:
+        # Includes GeminiTimeout/GeminiError once the client's own deadline or retries run out
+        logger.warning(f"LLM parse failed ({e!r}); using local parse")
+        return ParseOutcome(plan.data, plan.confidence, "fallback")
+    return apply_llm_result(plan, llm_data)
+
+
+def stream_resume_tiered(text, plan, llm_stream, llm_timeout=30.0):
+    """
+    Streaming counterpart of parse_resume_tiered for a plan from plan_tiered_parse.
+
+    Yields (section, value) pairs as soon as each top-level section is final:
+    confident local sections first, then sections as ``llm_stream(text)``
+    yields them. ``llm_stream`` must be a generator of (key, value) pairs that
+    returns the complete LLM result; it is passed ``fields`` the same way
+    parse_resume_tiered passes them to ``llm``. Returns the same ParseOutcome
+    the non-streaming call would have produced; if the stream raises or has not
+    finished ``llm_timeout`` seconds after it started, even while blocked in
+    a read, the local result is returned ("fallback").
+    """
+    if plan.tier == "local":
+        for section, value in plan.data.items():
+            yield section, value
+        return ParseOutcome(plan.data, plan.confidence, "local")
+
+    if plan.tier == "merged":
+        pending = {field.split(".")[0] for field in plan.low_fields}
+        for section, value in plan.data.items():
+            if section not in pending:
+                yield section, value
+    else:
+        pending = set(plan.data)
+    # Merged sections are built on a copy so a fallback still returns the untouched local result
+    merged = copy.deepcopy(plan.data)
+
+    # The LLM stream is read on a worker thread so a stalled read cannot outlast the deadline
+    items = queue.Queue()
+    cancelled = threading.Event()
+    _executor.submit(_pump, llm_stream, text, items, cancelled, _llm_kwargs(plan))
+    deadline = time.monotonic() + llm_timeout
+    try:
+        while True:
+            try:
+                kind, payload = items.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                logger.warning(f"LLM parse stream timed out after {llm_timeout}s; using local parse")
+                return ParseOutcome(plan.data, plan.confidence, "fallback")
+            if kind == "error":
+                logger.warning(f"LLM parse stream failed ({payload!r}); using local parse")
+                return ParseOutcome(plan.data, plan.confidence, "fallback")
+            if kind == "done":
+                llm_data = payload
+                break
+            section, value = payload
+            if plan.tier == "llm":
+                yield section, value
+            elif section in pending:
+                fields = [field for field in plan.low_fields if field.split(".")[0] == section]
+                _merge_fields(merged, fields, {section: value})
+                pending.discard(section)
+                yield section, merged[section]
+    finally:
+        cancelled.set()
+
+    return apply_llm_result(plan, llm_data)
+
+
+def _pump(llm_stream, text, items, cancelled, kwargs):
+    """Move (section, value) pairs from an LLM stream onto ``items``, ending with its result or exception"""
+    stream = llm_stream(text, **kwargs)
+    try:
+        while not cancelled.is_set():
+            try:
+                items.put(("item", next(stream)))
+            except StopIteration as stop:
+                items.put(("done", stop.value))
+                return
+        stream.close()
+    except Exception as e:
+        items.put(("error", e))
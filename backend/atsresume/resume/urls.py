@@ -1,11 +1,17 @@
 from django.urls import path
-from .views import  ResumeCreateView, ResumeRetrieveView, ResumeUpdateView, ResumeDeleteView, ResumeUploadView,ResumeImageView
+from .views import  ResumeCreateView, ResumeRetrieveView, ResumeUpdateView, ResumeAutosaveView, ResumeDeleteView, ResumeVersionListView, ResumeVersionView, ResumeUploadView,ResumeImageView, ExtractionJobView, ExtractionJobEventsView, ResumeBulkImportView
 
 urlpatterns = [
     path("create/", ResumeCreateView.as_view(), name="resume-create"),
     path("retrieve/", ResumeRetrieveView.as_view(), name="resume-retrieve"),  # Get by ID or email
     path("update/<str:id>/", ResumeUpdateView.as_view(), name="resume-update"),
+    path("autosave/<str:id>/", ResumeAutosaveView.as_view(), name="resume-autosave"),
+    path("versions/<str:id>/", ResumeVersionListView.as_view(), name="resume-versions"),
+    path("versions/<str:id>/<int:number>/", ResumeVersionView.as_view(), name="resume-version"),
     path("delete/<str:id>/", ResumeDeleteView.as_view(), name="resume-delete"),
     path('extract/', ResumeUploadView.as_view(), name='resume-data-extract'),
     path('image/<str:image_id>/', ResumeImageView.as_view(), name='resume-data-upload'),   
+    path('import/', ResumeBulkImportView.as_view(), name='resume-bulk-import'),
+    path('jobs/<str:job_id>/', ExtractionJobView.as_view(), name='resume-extract-job'),
+    path('jobs/<str:job_id>/events/', ExtractionJobEventsView.as_view(), name='resume-extract-job-events'),
 ]
\ No newline at end of file
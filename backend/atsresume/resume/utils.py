@@ -1,12 +1,13 @@
-import pdfplumber
-import docx
-import re
-import spacy
 import google.generativeai as genai
-import phonenumbers
 import json
 import os
 from dotenv import load_dotenv
+from .extraction import extract_text_from_pdf, extract_text_from_docx  # Shared extraction entry point
+from .nlp import get_nlp, name_window  # NER-only spaCy pipeline, loaded on first use
+from .gemini import get_gemini_client  # Process-wide model with deadlines and retries
+from .jsonstream import TopLevelFieldParser, strip_code_fence  # Incremental parsing of streamed JSON
+from .prompt import compile_batch_prompt, compile_prompt, pack_batches  # Token-budgeted prompt for Gemini
+from .scanner import scan, DEFAULT_PHONE_REGION  # Single pass over the text for all rule-based fields
 
 # Load environment variables
 load_dotenv()
@@ -16,98 +17,33 @@ gemini_api_key = os.getenv("REACT_APP_GEMINI_API_KEY")
 # Configure Gemini API with hardcoded key
 genai.configure(api_key=gemini_api_key)
 
-def extract_text_from_pdf(pdf_file):
-    """
-    Extract text from a PDF file using pdfplumber
-    """
-    try:
-        text = ""
-        with pdfplumber.open(pdf_file) as pdf:
-            for i, page in enumerate(pdf.pages):
-                print(f"Processing page {i+1} of {len(pdf.pages)}")
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-                else:
-                    print(f"Warning: No text extracted from page {i+1}")
-        
-        if not text.strip():
-            print("Warning: No text extracted from the entire PDF")
-            
-        return text.strip()
-    except Exception as e:
-        print(f"Error extracting text from PDF: {str(e)}")
-        raise Exception(f"Failed to extract text from PDF: {str(e)}")
-
-def extract_text_from_docx(docx_file):
-    doc = docx.Document(docx_file)
-    text = "\n".join([para.text for para in doc.paragraphs])
-    return text.strip()
-
 def parse_resume_text(text):
     """Basic parsing to extract resume fields (can be improved with NLP)"""
-    resume_data = {
-        "name": None,
-        "email": None,
-        "phone": None,
-        "summary": None,
-        "Experience": [],
-        "skills": [],
-        "projects": []
+    scanned = scan(text)
+    summary = scanned.sections.get("summary")
+    return {
+        "name": scanned.first_line,
+        "email": scanned.email,
+        "phone": scanned.phone,
+        "summary": " ".join(summary) if summary else None,
+        "Experience": scanned.sections.get("experience", []),
+        "skills": scanned.sections.get("skills", []),
+        "projects": scanned.sections.get("projects", []),
     }
 
-    lines = text.split("\n")
-    for line in lines:
-        if "@" in line:  # Extract Email
-            resume_data["email"] = line.strip()
-        elif any(char.isdigit() for char in line) and len(line) >= 10:  # Extract Phone Number
-            resume_data["phone"] = line.strip()
-        elif "Experience" in line:
-            resume_data["Experience"].append(line.strip())
-        elif "Skills" in line:
-            resume_data["skills"].append(line.strip())
-        elif "Projects" in line:
-            resume_data["projects"].append(line.strip())
-        elif resume_data["name"] is None:  # Assume the first line is the name
-            resume_data["name"] = line.strip()
-    
-    return resume_data
-
-nlp = spacy.load("en_core_web_sm")  # Load NLP model for text processing
-
-def extract_text_from_pdf(pdf_path):
-    """Extract text from a PDF file"""
-    text = ""
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            text += page.extract_text() + "\n"
-    return text
-
-def extract_text_from_docx(docx_path):
-    """Extract text from a DOCX file"""
-    doc = docx.Document(docx_path)
-    return "\n".join([para.text for para in doc.paragraphs])
-
 def extract_email(text):
     """Extract email from text using regex"""
-    match = re.search(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}", text)
-    return match.group(0) if match else None
+    return scan(text).email
 
-def extract_phone(text):
+def extract_phone(text, region=DEFAULT_PHONE_REGION):
     """Extract phone number from text using phonenumbers library"""
-    matches = re.findall(r'\+?\d[\d -]{8,15}\d', text)
-    for match in matches:
-        try:
-            phone = phonenumbers.parse(match, None)
-            if phonenumbers.is_valid_number(phone):
-                return phonenumbers.format_number(phone, phonenumbers.PhoneNumberFormat.INTERNATIONAL)
-        except:
-            continue
-    return None
+    return scan(text, region).phone
 
 def extract_name(text):
     """Extract the most probable name using NLP"""
-    doc = nlp(text)
+    return _first_person(get_nlp()(name_window(text)))
+
+def _first_person(doc):
     for ent in doc.ents:
         if ent.label_ == "PERSON":
             return ent.text
@@ -115,106 +51,63 @@ def extract_name(text):
 
 def extract_sections(text):
     """Extract structured sections from resume"""
-    sections = {
-        "experience": [],
-        "skills": [],
-        "projects": [],
-    }
-    
-    lines = text.split("\n")
-    current_section = None
-
-    for line in lines:
-        line_lower = line.lower().strip()
+    return _sections(scan(text))
 
-        if "experience" in line_lower:
-            current_section = "experience"
-        elif "skills" in line_lower:
-            current_section = "skills"
-        elif "projects" in line_lower:
-            current_section = "projects"
-        elif current_section:
-            sections[current_section].append(line.strip())
+def _sections(scanned):
+    return {
+        "experience": scanned.sections.get("experience", []),
+        "skills": scanned.sections.get("skills", []),
+        "projects": scanned.sections.get("projects", []),
+    }
 
-    return sections
+def _scanned_fields(scanned):
+    return {
+        "email": scanned.email,
+        "phone": scanned.phone,
+        **_sections(scanned),
+    }
 
 def parse_resume(text):
     return {
         "name": extract_name(text),
-        "email": extract_email(text),
-        "phone": extract_phone(text),
-        **extract_sections(text),
+        **_scanned_fields(scan(text)),
     }
 
+def parse_resumes(texts, batch_size=64, n_process=1):
+    """
+    Batch version of parse_resume for bulk re-parsing.
+    Streams texts through nlp.pipe and yields one result per input, in order,
+    so any iterable (e.g. a Mongo cursor) can be processed with flat memory.
+    """
+    pairs = ((name_window(text), text) for text in texts)
+    docs = get_nlp().pipe(pairs, as_tuples=True, batch_size=batch_size, n_process=n_process)
+    for doc, text in docs:
+        yield {
+            "name": _first_person(doc),
+            **_scanned_fields(scan(text)),
+        }
+
 def normalize_spaces(text):
     """Normalize spaces in the text to ensure proper formatting."""
     return " ".join(text.split())
 
-def parse_resume_with_gemini(text):
-    """Uses Gemini AI to extract structured data from the resume."""
-    model = genai.GenerativeModel("gemini-2.0-flash")  # Ensure correct model usage
-    chat = model.start_chat()  # Start a conversation
-
-    normalized_text = normalize_spaces(text)
-
-    prompt = f"""
-    Extract the following details from this resume:
-    - Name
-    - Email
-    - Phone Number only in 10 digits
-    - Address
-    - Summary (Ensure it's extracted properly. If missing, return null.)
-    - Skills (as a list)
-    - Experience (Job Title, Company, Start Date, End Date, Location, Description as separate tasks)
-    - Projects (Title, Description as separate tasks, Technologies used)
-    - Education (Institution, Graduation Date, Course, Location)
-
-    Structure it in **valid JSON** format:
-    {json.dumps({
-        "personal":{
-                    "name": "string",
-                    "email": "string",
-                    "phone": "string",
-                    "address": "string",
-                    "summary": "string or null",
-                    },
-        "skills": ["string"],
-        "experience": [
-            {
-                "jobTitle": "string",
-                "company": "string",
-                "startDate": "MM/YYYY",
-                "endDate": "MM/YYYY or null (if current)",
-                "location": "string",
-                "tasks": ["string"]  
-            }
-        ],
-        "projects": [
-            {
-                "name": "string",
-                "tasks": ["string"],  
-                "technologies": ["string"]
-            }
-        ],
-        "education": [
-            {
-                "institution": "string",
-                "graduation_date": "MM/YYYY",
-                "course": "string",
-                "location": "string"
-            }
-        ]
-    }, indent=5)}
-
-    Resume Text:
-    {normalized_text}
-    """
+def _gemini_prompt(text, fields=None):
+    # Cleaned, budget-trimmed text and a compact schema instead of the indented one
+    compiled = compile_prompt(text, fields=fields)
+    if compiled.trimmed_lines:
+        print(f"Trimmed {compiled.trimmed_lines} low-value lines to fit the prompt budget")
+    return compiled.prompt
 
-    response = chat.send_message(prompt)
-    response_text = response.text.strip()
+def parse_resume_with_gemini(text, fields=None):
+    """
+    Uses Gemini AI to extract structured data from the resume.
+    With ``fields`` (dotted paths such as "personal.email"), only those fields are asked for.
+    """
+    prompt = _gemini_prompt(text, fields)
 
-    if response_text.startswith("```json") and response_text.endswith("```"):
-        response_text = response_text[7:-3].strip()  
+    # One-shot prompt on the shared client: no chat session, bounded by a deadline and retried
+    response = get_gemini_client().generate(prompt)
+    response_text = strip_code_fence(response.text)
 
     try:
         response_dict = json.loads(response_text)
@@ -222,3 +115,51 @@ def parse_resume_with_gemini(text):
     except json.JSONDecodeError as e:
         print(f"Error parsing JSON response: {e}")
         return None
+
+def _parse_one_with_gemini(text):
+    try:
+        return parse_resume_with_gemini(text)
+    except Exception as e:
+        print(f"Error parsing resume with Gemini: {e}")
+        return None
+
+def parse_resumes_with_gemini(texts, batch_size=4, budget_tokens=None):
+    """
+    Batched version of parse_resume_with_gemini for bulk workloads.
+    Packs several resumes into one prompt (split further when the token budget
+    would be exceeded) and returns one result per input, in input order.
+    Resumes missing from a batched answer, or whose batch failed outright, are
+    retried one at a time; a resume that still fails maps to None.
+    """
+    texts = list(texts)
+    results = [None] * len(texts)
+    for batch in pack_batches(texts, batch_size, budget_tokens):
+        if len(batch) == 1:
+            results[batch[0][0]] = _parse_one_with_gemini(texts[batch[0][0]])
+            continue
+
+        parsed = {}
+        try:
+            prompt = compile_batch_prompt([(str(position), text) for position, (_, text) in enumerate(batch, 1)])
+            response = get_gemini_client().generate(prompt)
+            parsed = json.loads(strip_code_fence(response.text))
+        except Exception as e:
+            print(f"Batched Gemini call failed, retrying {len(batch)} resumes individually: {e}")
+        if not isinstance(parsed, dict):
+            parsed = {}
+
+        for position, (index, _) in enumerate(batch, 1):
+            result = parsed.get(str(position))
+            results[index] = result if isinstance(result, dict) else _parse_one_with_gemini(texts[index])
+    return results
+
+def stream_resume_with_gemini(text, fields=None):
+    """
+    Streaming version of parse_resume_with_gemini.
+    Yields (key, value) for each top-level section as soon as Gemini has sent
+    it completely, and returns the same result parse_resume_with_gemini would.
+    """
+    fields = TopLevelFieldParser()
+    for chunk in get_gemini_client().stream(_gemini_prompt(text, fields)):
+        yield from fields.feed(chunk)
+    return fields.result()
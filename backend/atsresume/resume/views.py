@@ -2,33 +2,87 @@ import json
 from bson import ObjectId
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.parsers import FormParser,MultiPartParser
+from rest_framework.parsers import FormParser,MultiPartParser,JSONParser
 from .utils import extract_text_from_pdf, extract_text_from_docx, parse_resume, parse_resume_with_gemini
 from bson import ObjectId
 from rest_framework.permissions import IsAuthenticated
 from django.views import View   
 from bson import ObjectId
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
 from rest_framework.decorators import api_view, permission_classes
 import PyPDF2
 import io
-from datetime import datetime
+import calendar
+import hashlib
+import re
+import time
+from datetime import datetime, timezone
+import atexit
+import pymongo
+from pymongo import ReturnDocument
+from pymongo.errors import WriteError
 
 from db_connection import get_mongo_connection
 import gridfs
 # Get MongoDB collection
 
 #imports for resume upload
-import tempfile
-import os
-import pdfplumber
-import docx
-from .utils import parse_resume_with_gemini  # Import LLM function
+from .extraction import (
+    extract_text_from_pdf, extract_text_from_docx, open_upload_buffer,
+    ExtractionError, PageLimitExceeded, PDF_BACKENDS
+)
+from .utils import parse_resume_with_gemini, parse_resumes_with_gemini, stream_resume_with_gemini  # Import LLM functions
+from .cache import ExtractionCache, content_digest
+from .tiered import ParseOutcome, parse_resume_tiered, plan_tiered_parse, stream_resume_tiered
+from .bulk import BulkImporter, iter_zip, open_zip
+from .images import (
+    PENDING_VARIANT_CACHE_CONTROL,
+    InlineImage,
+    data_uri,
+    gridfs_response,
+    inline_image,
+    pick_variant,
+    release_image,
+    schedule_variants,
+    store_image,
+)
+from .summary import SUMMARY_PROJECTION, build_summary, patch_summary_updates, summary_updates
+from .patch import (
+    PatchConflict,
+    PatchError,
+    Unrepresentable,
+    apply_json_patch,
+    apply_merge_patch,
+    json_patch_update,
+    merge_patch_update,
+    section_update,
+    validate_json_patch,
+)
+from .autosave import AutosaveBuffer
+from .history import ResumeHistory
+from .jobs import ExtractionJobQueue, QUEUED, RUNNING, DONE, FAILED
+from django.conf import settings
 
 db = get_mongo_connection()
 fs = gridfs.GridFS(db)
 
 resume_collection = db["resumes"]  # Using "resumes" collection
+fs_files = db["fs.files"]  # GridFS file documents, for image reference counts and variants
+extraction_cache = ExtractionCache(
+    db["extraction_cache"],
+    max_entries=settings.EXTRACTION_CACHE_MAX_ENTRIES,
+    max_bytes=settings.EXTRACTION_CACHE_MAX_BYTES,
+    ttl_seconds=settings.EXTRACTION_CACHE_TTL_SECONDS,
+)
+autosave_buffer = AutosaveBuffer(
+    resume_collection,
+    interval=settings.RESUME_AUTOSAVE_INTERVAL_SECONDS,
+    max_pending=settings.RESUME_AUTOSAVE_MAX_PENDING,
+)
+atexit.register(autosave_buffer.flush)  # Write the last buffered edits on graceful shutdown
+resume_history = ResumeHistory(db["resume_versions"], snapshot_every=settings.RESUME_HISTORY_SNAPSHOT_EVERY)
 
 class ResumeCreateView(APIView):
     parser_classes = (MultiPartParser, FormParser)  # Allow file uploads
@@ -42,40 +96,103 @@ class ResumeCreateView(APIView):
         user_id = data.get("user_id")
 
         # Handle image upload
-        image_id = None
+        image_fields, image = {}, None
         if "image" in request.FILES:
             uploaded_image = request.FILES["image"]
             print(uploaded_image)
-            image_id = fs.put(uploaded_image, filename=uploaded_image.name)
+            image_fields, image = _save_image(uploaded_image)
 
         # Prepare resume data
+        resume_details = json.loads(data.get("resumeData", {}))
+        now = datetime.now(timezone.utc)
         resume_data = {
             "_id": resume_id,
             "user_id": user_id,
             "title":"",
-            "resume_details": json.loads(data.get("resumeData", {})),
+            "resume_details": resume_details,
             "email": data.get("email", ""),
-            "image_id": str(image_id) if image_id else None
+            "image_id": None,
+            "image_variants": None,
+            "updated_at": now,
+            "version": 1,  # Bumped on every update but autosaves; drives the retrieve ETag with updated_at
+            "summary": build_summary("", resume_details, now),  # Denormalized for list views
+            **image_fields,
         }
 
         # Save to database
         resume_collection.insert_one(resume_data)
+        if image and image.created:
+            _schedule_variants(image.id)
         return Response({"message": "Resume saved successfully", "resume_id": resume_id}, status=201)
 
+def _save_image(uploaded_image):
+    """
+    Store an uploaded photo inline on the resume when it is small, else in
+    GridFS (reusing an identical stored photo). Returns the resume fields to
+    set and the StoredImage, which is None for inline photos.
+    """
+    inline = inline_image(uploaded_image, settings.RESUME_IMAGE_INLINE_MAX_BYTES)
+    if inline:
+        return {"image_id": str(ObjectId()), "image_inline": inline, "image_variants": None}, None
+    image = store_image(fs, fs_files, uploaded_image)
+    return {"image_id": str(image.id), "image_inline": None, "image_variants": image.variants}, image
+
+
+# Enough of the replaced resume to release its photo
+PREVIOUS_IMAGE_PROJECTION = {"image_id": 1, "image_inline.sha256": 1}
+
+
+def _image_differs(image_fields):
+    """Filter matching resumes whose photo is not the one in ``image_fields``"""
+    inline = image_fields["image_inline"]
+    if inline:
+        return {"image_inline.sha256": {"$ne": inline["sha256"]}}
+    return {"$or": [{"image_inline": {"$ne": None}}, {"image_id": {"$ne": image_fields["image_id"]}}]}
+
+
+def _field_update(update_fields):
+    return {"$set": {**update_fields, **summary_updates(update_fields)}, "$inc": {"version": 1}}
+
+
+def _resume_exists(id):
+    return resume_collection.find_one({"_id": id}, {"_id": 1}) is not None
+
+
+def _release_image(resume):
+    # Inline photos go away with the resume document; GridFS ones are reference counted
+    if resume.get("image_id") and not resume.get("image_inline"):
+        release_image(fs, fs_files, resume["image_id"])
+
+
+def _schedule_variants(image_id):
+    schedule_variants(fs, fs_files, image_id, resume_collection, settings.RESUME_IMAGE_VARIANT_SIZES)
+
+
+class JSONPatchParser(JSONParser):
+    media_type = "application/json-patch+json"
+
+
+class MergePatchParser(JSONParser):
+    media_type = "application/merge-patch+json"
+
+
 class ResumeUpdateView(APIView):
     """
     API to update an existing resume by ID, including updating the image.
+
+    PUT replaces fields from a multipart form; PATCH applies a JSON Patch or
+    JSON Merge Patch to the title and resume_details.
     """
-    parser_classes = (MultiPartParser, FormParser)  # Allow file uploads
+    parser_classes = (MultiPartParser, FormParser, JSONPatchParser, MergePatchParser)  # Allow file uploads and patches
 
     def put(self, request, id):
+        """
+        Set the fields sent in a multipart form. The resume is not read
+        first: the update filter only matches when a field differs, and a
+        photo update returns the previous photo so its reference can be
+        released.
+        """
         updated_data = request.data
-        print(updated_data)
-
-        resume = resume_collection.find_one({"_id": id})
-        print(resume)
-        if not resume:
-            return Response({"error": "Resume not found"}, status=404)
 
         update_fields = {}  # Store only provided fields
 
@@ -95,70 +212,334 @@ class ResumeUpdateView(APIView):
                 return Response({"error": "Invalid JSON format in resumeData"}, status=400)
 
         # Handle image update if new image is uploaded
+        image_fields, image = {}, None
         if "image" in request.FILES:
-            uploaded_image = request.FILES["image"]
-            image_id = fs.put(uploaded_image, filename=uploaded_image.name)  # Save new image to GridFS
+            image_fields, image = _save_image(request.FILES["image"])  # Inline, new in GridFS, or an identical stored one
+
+        if not update_fields and not image_fields:
+            return Response({"error": "No valid fields provided to update"}, status=400)
+
+        if image_fields:
+            previous = resume_collection.find_one_and_update(
+                {"_id": id, **_image_differs(image_fields)},
+                _field_update({**update_fields, **image_fields}),
+                projection=PREVIOUS_IMAGE_PROJECTION,
+                return_document=ReturnDocument.BEFORE,
+            )
+            if previous is not None:
+                # The old photo is only deleted once no other resume uses it
+                _release_image(previous)
+                if image and image.created:
+                    _schedule_variants(image.id)
+                return Response({"message": "Resume updated successfully"}, status=200)
+            if image:
+                release_image(fs, fs_files, image.id)  # Same photo again, or no such resume: give the new reference back
+            if not update_fields:
+                if not _resume_exists(id):
+                    return Response({"error": "Resume not found"}, status=404)
+                return Response({"error": "No valid fields provided to update"}, status=400)
+
+        result = resume_collection.update_one(
+            {"_id": id, "$or": [{field: {"$ne": value}} for field, value in update_fields.items()]},
+            _field_update(update_fields),
+            upsert=False,
+        )
+        if result.matched_count:
+            return Response({"message": "Resume updated successfully"}, status=200)
+        if not _resume_exists(id):
+            return Response({"error": "Resume not found"}, status=404)
+        return Response({"error": "No changes made"}, status=400)
+
+    def patch(self, request, id):
+        """
+        Patch the title and resume_details with targeted $set/$unset/$push
+        operators, so an edit to one bullet point does not rewrite the resume.
+
+        The version the patch was made against must be sent as
+        ``If-Match: "<version>"`` or as a leading ``test`` of ``/version``; a
+        resume that has changed since is answered with 412 and its current
+        version. Patches MongoDB cannot apply as one update are applied to the
+        stored resume here and written back section by section, under the
+        same version check.
+        """
+        media_type = request.content_type.split(";")[0].strip()
+        if media_type not in (JSONPatchParser.media_type, MergePatchParser.media_type):
+            return Response(
+                {"error": f"Use {JSONPatchParser.media_type} or {MergePatchParser.media_type}"}, status=415
+            )
+        merge = media_type == MergePatchParser.media_type
+        patch = request.data
+        tested, patch = (None, patch) if merge else _leading_version_test(patch)
+        version = _if_match_version(request)
+        version = tested if version is None else version
+        if version is None:
+            return Response({"error": 'Send the resume version as If-Match: "<version>"'}, status=428)
 
-            # Remove old image if exists
-            if resume.get("image_id"):
-                try:
-                    fs.delete(ObjectId(resume["image_id"]))  # Delete old image from GridFS
-                except gridfs.errors.NoFile:
-                    pass
+        try:
+            if not merge:
+                validate_json_patch(patch)
+            try:
+                conditions, update = ({}, merge_patch_update(patch)) if merge else json_patch_update(patch)
+                if not update:
+                    raise Unrepresentable("empty patch")
+                result = _write_patch(id, version, update, conditions)
+                if not result.matched_count:
+                    raise Unrepresentable("stale version or missing path")
+            except (Unrepresentable, WriteError):
+                # Applied to the stored resume here, which also tells a stale version from a bad path
+                resume = resume_collection.find_one(
+                    {"_id": id, "version": _stored_version(version)}, {"title": 1, "resume_details": 1}
+                )
+                if resume is None:
+                    return _patch_rejected(id)
+                current = {"title": resume.get("title") or "", "resume_details": resume.get("resume_details") or {}}
+                patched = apply_merge_patch(current, patch) if merge else apply_json_patch(current, patch)
+                update = section_update(current, patched)
+                if not update:
+                    return Response({"message": "No changes made", "version": version}, status=200)
+                result = _write_patch(id, version, update)
+        except PatchConflict as e:
+            return Response({"error": str(e)}, status=409)
+        except PatchError as e:
+            return Response({"error": str(e)}, status=400)
+
+        if not result.matched_count:
+            return _patch_rejected(id)
+        return Response({"message": "Resume updated successfully", "version": version + 1}, status=200)
+
+
+class ResumeAutosaveView(APIView):
+    """
+    API for builder autosaves: a JSON Merge Patch of the title and
+    resume_details, acknowledged with 202 once buffered. Edits are merged per
+    resume and written in batches (see resume.autosave), so rapid saves cost
+    one write per resume per interval. Use PATCH for version-checked saves;
+    autosaves do not change the version.
+
+    Only resumes of the ``user_id`` query parameter (or, without it, resumes
+    with no owner) are accepted; anything else is answered with 404 before
+    it is buffered.
+    """
+    parser_classes = (JSONParser, MergePatchParser)
+
+    def post(self, request, id):
+        try:
+            update = merge_patch_update(request.data)
+        except Unrepresentable as e:
+            return Response({"error": f"Cannot autosave an empty object at {e}; use PATCH"}, status=400)
+        except PatchError as e:
+            return Response({"error": str(e)}, status=400)
+        # Checked per request, so unknown or foreign ids never reach the buffer
+        owner = request.query_params.get("user_id")
+        if resume_collection.find_one({"_id": id, "user_id": owner}, {"_id": 1}) is None:
+            return Response({"error": "Resume not found"}, status=404)
+        if update:
+            autosave_buffer.submit(id, update)
+        return Response({"message": "Autosave accepted"}, status=202)
 
-            update_fields["image_id"] = str(image_id)  # Store new image ID
 
-      
+def _if_match_version(request):
+    header = request.META.get("HTTP_IF_MATCH")
+    if not header:
+        return None
+    value = header.strip()
+    value = value[2:] if value.startswith("W/") else value
+    value = value.strip('"')
+    # Anything but a version number (such as a retrieve ETag) can never match
+    return int(value) if value.isdigit() else -1
 
-        # Only update if there are changes
-        if update_fields:
-            print(update_fields)
-            result = resume_collection.update_one({"_id": id}, {"$set": update_fields})
-            if result.modified_count:
-                return Response({"message": "Resume updated successfully"}, status=200)
-            return Response({"error": "No changes made"}, status=400)
 
-        return Response({"error": "No valid fields provided to update"}, status=400)
-    
+def _leading_version_test(patch):
+    if isinstance(patch, list) and patch and isinstance(patch[0], dict) and patch[0].get("op") == "test" \
+            and patch[0].get("path") == "/version" and isinstance(patch[0].get("value"), int):
+        return patch[0]["value"], patch[1:]
+    return None, patch
+
+
+def _stored_version(version):
+    # Resumes written before versioning have no version field; clients see them as version 0
+    return version or None
+
+
+def _write_patch(id, version, update, conditions=None):
+    summary_sets, summary_increments = patch_summary_updates(update)
+    update = {
+        **update,
+        "$set": {**update.get("$set", {}), **summary_sets},
+        "$inc": {"version": 1, **summary_increments},
+    }
+    query = {**(conditions or {}), "_id": id, "version": _stored_version(version)}
+    return resume_collection.update_one(query, update)
+
+
+def _patch_rejected(id):
+    current = resume_collection.find_one({"_id": id}, {"version": 1})
+    if not current:
+        return Response({"error": "Resume not found"}, status=404)
+    return Response(
+        {"error": "Resume has changed since that version", "version": current.get("version") or 0}, status=412
+    )
+
 
 class ResumeRetrieveView(APIView):
     """
     API to retrieve resumes, including the associated image.
+
+    ``view=summary`` returns only the fields list views need and ``fields=``
+    picks top-level or dotted fields; both are applied as Mongo projections.
+    For user_id/email lookups, ``limit`` (and the ``cursor`` returned as
+    ``next_cursor``) pages through resumes in _id order. ``embed_images=1``
+    adds an ``image_data_uri`` for photos stored inline.
+
+    Responses carry an ETag built from each resume's version counter;
+    single-resume responses also carry a Last-Modified date. Conditional
+    requests are answered with 304 after reading only those fields.
     """
     def get(self, request):
         email = request.query_params.get("email")
         resume_id = request.query_params.get("id")
         user_id = request.query_params.get("user_id")
 
+        try:
+            projection = _retrieve_projection(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+
         if resume_id:
-            resume = resume_collection.find_one({"_id": resume_id})
+            if _is_conditional(request):
+                meta = resume_collection.find_one({"_id": resume_id}, VALIDATOR_PROJECTION)
+                if not meta:
+                    return Response({"error": "Resume not found"}, status=404)
+                not_modified = get_conditional_response(request, *_validators([meta]))
+                if not_modified:
+                    return _cache_headers(not_modified)
+
+            fields, extra = _with_validator_fields(projection)
+            resume = resume_collection.find_one({"_id": resume_id}, fields)
             if resume:
-                resume["_id"] = str(resume["_id"])
-                if "image_id" in resume and resume["image_id"]:
-                    resume["image_url"] = f"{resume['image_id']}"
-                return Response(resume, status=200)
+                validators = _validators([resume])
+                return _cache_headers(Response(_present(resume, extra), status=200), *validators)
             return Response({"error": "Resume not found"}, status=404)
 
         if user_id:
-            resumes = list(resume_collection.find({"user_id": user_id}))
-            for resume in resumes:
-                resume["_id"] = str(resume["_id"])
-                if "image_id" in resume and resume["image_id"]:
-                    resume["image_url"] = f"{resume['image_id']}"
-            return Response(resumes, status=200)
+            return _list_resumes(request, {"user_id": user_id}, projection)
 
         if email:
-            resumes = list(resume_collection.find({"email": email}))
-            for resume in resumes:
-                resume["_id"] = str(resume["_id"])
-                if "image_id" in resume and resume["image_id"]:
-                    resume["image_url"] = f"{resume['image_id']}"
-            return Response(resumes, status=200)
+            return _list_resumes(request, {"email": email}, projection)
 
         return Response({"error": "Please provide email, user ID, or resume ID"}, status=400)
 
 
-
+_FIELD_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z0-9_]+)*")
+
+# Fields that determine a resume's ETag and Last-Modified
+VALIDATOR_FIELDS = ("version", "updated_at")
+VALIDATOR_PROJECTION = {field: 1 for field in VALIDATOR_FIELDS}
+
+
+def _embeds_images(params):
+    return params.get("embed_images") in ("1", "true")
+
+
+def _retrieve_projection(params):
+    # Inline photo bytes are only read when they are embedded
+    inline = {"image_inline": 1} if _embeds_images(params) else {}
+    if params.get("view") == "summary":
+        return {**SUMMARY_PROJECTION, **inline}
+    if params.get("view") not in (None, "", "full"):
+        raise ValueError(f"Unknown view: {params.get('view')}")
+    if not params.get("fields"):
+        return None if inline else {"image_inline": 0}
+    fields = [field.strip() for field in params["fields"].split(",") if field.strip()]
+    for field in fields:
+        if not _FIELD_RE.fullmatch(field):
+            raise ValueError(f"Invalid field: {field}")
+    return {"_id": 1, **{field: 1 for field in fields}, **inline}
+
+
+def _with_validator_fields(projection):
+    """Add the validator fields to a projection; returns it and the fields to drop from responses"""
+    if projection is None or not any(projection.values()):
+        return projection, ()
+    extra = tuple(field for field in VALIDATOR_FIELDS if field not in projection)
+    return {**projection, **{field: 1 for field in extra}}, extra
+
+
+def _is_conditional(request):
+    return "HTTP_IF_NONE_MATCH" in request.META or "HTTP_IF_MODIFIED_SINCE" in request.META
+
+
+def _validators(resumes):
+    """Strong ETag and Last-Modified timestamp for the resumes in a response, in order"""
+    digest = hashlib.sha1()
+    last_modified = None
+    for resume in resumes:
+        updated_at = resume.get("updated_at")
+        digest.update(f"{resume['_id']}:{resume.get('version', 0)}:{updated_at}|".encode())
+        if updated_at is not None:
+            timestamp = calendar.timegm(updated_at.utctimetuple())
+            last_modified = timestamp if last_modified is None else max(last_modified, timestamp)
+    return f'"{digest.hexdigest()}"', last_modified
+
+
+def _cache_headers(response, etag=None, last_modified=None):
+    # Resumes are per-user and editable: cache privately but always revalidate
+    response["Cache-Control"] = "private, no-cache"
+    if etag:
+        response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+def _present(resume, extra=()):
+    resume["_id"] = str(resume["_id"])
+    for field in extra:
+        resume.pop(field, None)
+    if "image_id" in resume and resume["image_id"]:
+        resume["image_url"] = f"{resume['image_id']}"
+    inline = resume.pop("image_inline", None)
+    if inline:
+        resume["image_data_uri"] = data_uri(inline)
+    return resume
+
+
+def _list_resumes(request, query, projection):
+    params = request.query_params
+    paginate = "limit" in params or "cursor" in params
+    limit = None
+    if paginate:
+        # Keyset pagination: resume ids are ObjectId hex strings, so they sort in creation order
+        try:
+            limit = int(params.get("limit", settings.RESUME_PAGE_DEFAULT_LIMIT))
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=400)
+        if not 1 <= limit <= settings.RESUME_PAGE_MAX_LIMIT:
+            return Response({"error": f"limit must be between 1 and {settings.RESUME_PAGE_MAX_LIMIT}"}, status=400)
+        if params.get("cursor"):
+            query = {**query, "_id": {"$gt": params["cursor"]}}
+
+    def find(fields):
+        cursor = resume_collection.find(query, fields)
+        return cursor.sort("_id", pymongo.ASCENDING).limit(limit + 1) if paginate else cursor
+
+    # Lists are validated by ETag only: the newest updated_at does not change when a resume is deleted
+    if "HTTP_IF_NONE_MATCH" in request.META:
+        etag, _ = _validators(list(find(VALIDATOR_PROJECTION)))
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified:
+            return _cache_headers(not_modified)
+
+    fields, extra = _with_validator_fields(projection)
+    documents = list(find(fields))
+    etag, _ = _validators(documents)
+    resumes = [_present(resume, extra) for resume in documents]
+    if not paginate:
+        return _cache_headers(Response(resumes, status=200), etag)
+
+    next_cursor = resumes[limit - 1]["_id"] if len(resumes) > limit else None
+    body = {"results": resumes[:limit], "next_cursor": next_cursor}
+    return _cache_headers(Response(body, status=200), etag)
 
 
 class ResumeDeleteView(APIView):
@@ -171,28 +552,83 @@ class ResumeDeleteView(APIView):
         if not resume:
             return Response({"error": "Resume not found"}, status=404)
 
-        # Delete image from GridFS
-        if "image_id" in resume and resume["image_id"]:
-            try:
-                fs.delete(ObjectId(resume["image_id"]))
-            except gridfs.errors.NoFile:
-                pass
-
         result = resume_collection.delete_one({"_id": id})
 
         if result.deleted_count:
+            # Delete image and its variants from GridFS once no other resume uses it
+            _release_image(resume)
+            resume_history.delete(id)
             return Response({"message": "Resume deleted successfully"}, status=200)
         return Response({"error": "Failed to delete resume"}, status=400)
 
+class ResumeVersionListView(APIView):
+    """
+    API to list a resume's saved versions (GET) and save its current content
+    as a new one (POST, with an optional ``label`` such as the job it was
+    tailored for). Listings return version metadata only.
+    """
+    def get(self, request, id):
+        return Response({"versions": resume_history.list(id)}, status=200)
+
+    def post(self, request, id):
+        if not isinstance(request.data, dict):
+            return Response({"error": "Request body must be an object"}, status=400)
+        label = request.data.get("label") or ""
+        if not isinstance(label, str) or len(label) > 200:
+            return Response({"error": "label must be a string of at most 200 characters"}, status=400)
+        resume = resume_collection.find_one({"_id": id}, {"title": 1, "resume_details": 1, "version": 1})
+        if not resume:
+            return Response({"error": "Resume not found"}, status=404)
+        return Response(resume_history.create(resume, label), status=201)
+
+
+class ResumeVersionView(APIView):
+    """
+    API to rebuild one saved version of a resume, with its title and resume_details.
+    """
+    def get(self, request, id, number):
+        version = resume_history.get(id, number)
+        if version is None:
+            return Response({"error": "Version not found"}, status=404)
+        return Response(version, status=200)
+
+
 class ResumeImageView(View):
     """
-    API to serve images stored in GridFS.
+    API to serve images stored inline on a resume or in GridFS.
+
+    Without ``?size=`` the original is always served, so its URL can be
+    cached as immutable. ``?size=`` asks for the smallest variant at least
+    that many pixels on its longest edge, as WebP or JPEG depending on the
+    Accept header; until variants have been generated the original stands in
+    for it under a short cache lifetime.
     """
     def get(self, request, image_id):
+        size = request.GET.get("size")
+        if size is not None and not size.isdigit():
+            return HttpResponse("Invalid size", status=400)
+
         try:
+            # Small photos are stored on the resume itself
+            resume = resume_collection.find_one(
+                {"image_id": image_id, "image_inline": {"$ne": None}}, {"image_inline": 1}
+            )
+            if resume:
+                return gridfs_response(request, InlineImage(image_id, resume["image_inline"]))
+
             file_data = fs.get(ObjectId(image_id))  # Get file from GridFS
-            response = HttpResponse(file_data, content_type="image/png")  # ✅ Ensure binary response
-            response["Content-Disposition"] = f'inline; filename="{file_data.filename}"'
+            variant_id = None
+            if size:
+                variant_id = pick_variant(file_data, int(size), request.META.get("HTTP_ACCEPT"))
+                if variant_id:
+                    file_data = fs.get(ObjectId(variant_id))
+            # Only the files documents have been read so far; chunks are streamed if a body is sent
+            response = gridfs_response(request, file_data)
+            if size:
+                # The body depends on Accept once variants exist, including for the original served until then
+                patch_vary_headers(response, ("Accept",))
+                if not variant_id:
+                    response["Cache-Control"] = PENDING_VARIANT_CACHE_CONTROL
             return response
         except gridfs.errors.NoFile:
             return HttpResponse("Image not found", status=404)
@@ -211,45 +647,266 @@ class ResumeUploadView(APIView):
         uploaded_file = request.FILES['file']
         file_extension = uploaded_file.name.split('.')[-1].lower()
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f".{file_extension}") as temp_file:
-            for chunk in uploaded_file.chunks():
-                temp_file.write(chunk)
-            temp_file_path = temp_file.name
+        if file_extension not in ["pdf", "doc", "docx"]:
+            return Response({"error": "Unsupported file format"}, status=400)
+
+        # Optional PDF backend override, e.g. ?extractor=pdfplumber
+        extractor = request.query_params.get("extractor") or request.data.get("extractor")
+        if extractor and extractor not in PDF_BACKENDS:
+            return Response({"error": f"Unknown extractor: {extractor}"}, status=400)
+
+        with open_upload_buffer(uploaded_file) as buffer:
+            if request.query_params.get("async") in ("1", "true"):
+                if len(buffer) > settings.EXTRACTION_JOB_MAX_BYTES:
+                    return Response({"error": "File too large for asynchronous extraction"}, status=413)
+                job_id = extraction_jobs.enqueue(buffer, file_extension, extractor)
+                status_url = f"/resume/jobs/{job_id}/"
+                response = Response(
+                    {
+                        "job_id": job_id,
+                        "status": "queued",
+                        "status_url": status_url,
+                        "events_url": f"{status_url}events/",
+                    },
+                    status=202,
+                )
+                response["Location"] = status_url
+                return response
 
-        try:
-            if file_extension == "pdf":
-                extracted_text = extract_text_from_pdf(temp_file_path)
-            elif file_extension in ["doc", "docx"]:
-                extracted_text = extract_text_from_docx(temp_file_path)
-            else:
-                return Response({"error": "Unsupported file format"}, status=400)
+            try:
+                if request.query_params.get("stream") in ("1", "true"):
+                    return stream_extraction(buffer, file_extension, extractor)
 
-            # Call LLM function for structured resume parsing
-            extracted_data = parse_resume_with_gemini(extracted_text)
-            return Response(extracted_data, status=200)
+                extracted_data, cache_status, tier = run_extraction(buffer, file_extension, extractor)
+                response = Response(extracted_data, status=200)
+                response["X-Extraction-Cache"] = cache_status
+                response["X-Parse-Tier"] = tier
+                return response
 
-        except Exception as e:
-            return Response({"error": str(e)}, status=500)
-        finally:
-            os.remove(temp_file_path)  # Clean up temp file
+            except PageLimitExceeded as e:
+                return Response({"error": str(e)}, status=400)
+            except ExtractionError as e:
+                return Response({"error": str(e)}, status=504)
+            except Exception as e:
+                return Response({"error": str(e)}, status=500)
 
-def extract_text_from_pdf(pdf_path):
-    """Extract text from a PDF file"""
-    text = ""
-    try:
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                text += page.extract_text() or ""
-        return text.strip()
-    except Exception as e:
-        print(f"Error extracting text from PDF: {e}")
-        return ""
-
-def extract_text_from_docx(docx_path):
-    """Extract text from a DOCX file"""
+
+def extraction_cache_key(data, file_extension, extractor=None):
+    """Cache key for an upload: its content digest plus the backend that extracts it"""
+    backend = (extractor or settings.PDF_EXTRACTOR) if file_extension == "pdf" else "docx"
+    return f"{content_digest([data])}:{backend}"
+
+
+def extract_text(data, file_extension, extractor=None):
+    if file_extension == "pdf":
+        return extract_text_from_pdf(data, backend=extractor)
+    return extract_text_from_docx(data)
+
+
+def run_extraction(data, file_extension, extractor=None, llm=None, llm_timeout=None, executor=None):
+    """
+    Extract and parse an uploaded resume, going through the extraction cache.
+    Returns the structured data, whether the cache was hit and the parse tier used.
+    """
+    # Identical uploads are served from the cache without re-extracting or calling the LLM
+    digest = extraction_cache_key(data, file_extension, extractor)
+    cached = extraction_cache.get(digest)
+    if cached is not None:
+        return cached["parsed"], "hit", "cache"
+
+    extracted_text = extract_text(data, file_extension, extractor)
+
+    # Local parser first; the LLM is only called for fields it is not confident about
+    outcome = parse_resume_tiered(
+        extracted_text,
+        llm=llm or parse_resume_with_gemini,
+        threshold=settings.LOCAL_PARSE_CONFIDENCE_THRESHOLD,
+        llm_timeout=llm_timeout or settings.LLM_PARSE_TIMEOUT_SECONDS,
+        executor=executor,
+    )
+    # A fallback after an LLM timeout is served but not cached, so the next upload retries the LLM
+    if outcome.tier != "fallback":
+        extraction_cache.put(digest, extracted_text, outcome.data)
+    return outcome.data, "miss", outcome.tier
+
+
+def stream_extraction(data, file_extension, extractor=None):
+    """
+    Server-sent events version of run_extraction. Each top-level section is
+    sent as a "field" event as soon as it is final; the closing "result"
+    event carries the same payload the non-streaming upload returns.
+    Text extraction happens before the response starts, so its errors are
+    still reported with a status code.
+    """
+    digest = extraction_cache_key(data, file_extension, extractor)
+    cached = extraction_cache.get(digest)
+    if cached is not None:
+        events = _cached_events(cached["parsed"])
+        cache_status, tier = "hit", "cache"
+    else:
+        extracted_text = extract_text(data, file_extension, extractor)
+        plan = plan_tiered_parse(extracted_text, threshold=settings.LOCAL_PARSE_CONFIDENCE_THRESHOLD)
+        events = _parse_events(digest, extracted_text, plan)
+        cache_status, tier = "miss", plan.tier
+
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    response["X-Extraction-Cache"] = cache_status
+    response["X-Parse-Tier"] = tier
+    return response
+
+
+def _cached_events(parsed):
+    if isinstance(parsed, dict):
+        for key, value in parsed.items():
+            yield _sse("field", {"key": key, "value": value})
+    yield _sse("result", parsed)
+
+
+def _parse_events(digest, extracted_text, plan):
+    fields = stream_resume_tiered(
+        extracted_text,
+        plan,
+        llm_stream=stream_resume_with_gemini,
+        llm_timeout=settings.LLM_PARSE_TIMEOUT_SECONDS,
+    )
     try:
-        doc = docx.Document(docx_path)
-        return "\n".join([para.text for para in doc.paragraphs]).strip()
-    except Exception as e:
-        print(f"Error extracting text from DOCX: {e}")
-        return ""
\ No newline at end of file
+        while True:
+            try:
+                key, value = next(fields)
+            except StopIteration as stop:
+                outcome = stop.value
+                break
+            yield _sse("field", {"key": key, "value": value})
+    except Exception:
+        # LLM failures already end in a fallback; anything else still gets the local parse
+        outcome = ParseOutcome(plan.data, plan.confidence, "fallback")
+
+    if outcome.tier == "fallback":
+        # The result below replaces any sections the LLM had already sent
+        yield _sse("fallback", {"tier": outcome.tier})
+    else:
+        extraction_cache.put(digest, extracted_text, outcome.data)
+    yield _sse("result", outcome.data)
+
+
+def make_bulk_importer(user_id=None, **options):
+    """Bulk importer writing into the resumes collection, configured from settings unless overridden"""
+    return BulkImporter(
+        resume_collection,
+        handler=lambda data, file_extension, llm, executor: run_extraction(
+            data, file_extension, llm=llm, llm_timeout=settings.BULK_IMPORT_LLM_TIMEOUT_SECONDS, executor=executor
+        ),
+        llm=parse_resume_with_gemini,
+        workers=options.get("workers") or settings.BULK_IMPORT_WORKERS,
+        llm_concurrency=options.get("llm_concurrency") or settings.BULK_IMPORT_LLM_CONCURRENCY,
+        batch_size=options.get("batch_size") or settings.BULK_IMPORT_BATCH_SIZE,
+        user_id=user_id,
+        batch_llm=lambda texts: parse_resumes_with_gemini(texts, batch_size=len(texts)),
+        llm_batch_size=options.get("llm_batch_size") or settings.BULK_IMPORT_LLM_BATCH_SIZE,
+        llm_batch_wait=settings.BULK_IMPORT_LLM_BATCH_WAIT_SECONDS,
+    )
+
+
+class ResumeBulkImportView(APIView):
+    """
+    API to import a ZIP archive of PDF/DOCX resumes. Progress and results are
+    streamed back as newline-delimited JSON: a "parsed" record per file as it
+    is parsed, an "imported" (or "failed") record when it is written, and a
+    summary record.
+    """
+    parser_classes = (MultiPartParser, FormParser)
+
+    def post(self, request):
+        if 'file' not in request.FILES:
+            return Response({"error": "No file uploaded"}, status=400)
+
+        try:
+            archive = open_zip(request.FILES['file'])
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+        if len(archive.infolist()) > settings.BULK_IMPORT_MAX_FILES:
+            return Response({"error": f"Archive has more than {settings.BULK_IMPORT_MAX_FILES} files"}, status=400)
+
+        importer = make_bulk_importer(user_id=request.data.get("user_id"))
+        records = importer.run(iter_zip(archive, settings.EXTRACTION_JOB_MAX_BYTES))
+        response = StreamingHttpResponse(
+            (json.dumps(record, default=str) + "\n" for record in records),
+            content_type="application/x-ndjson",
+        )
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+
+extraction_jobs = ExtractionJobQueue(
+    db["extraction_jobs"],
+    handler=lambda data, file_extension, extractor: run_extraction(data, file_extension, extractor)[0],
+    workers=settings.EXTRACTION_JOB_WORKERS,
+    poll_interval=settings.EXTRACTION_JOB_POLL_SECONDS,
+)
+
+
+def _job_payload(job):
+    payload = {"job_id": job["_id"], "status": job["status"]}
+    if job["status"] == DONE:
+        payload["result"] = job.get("result")
+    elif job["status"] == FAILED:
+        payload["error"] = job.get("error")
+    return payload
+
+
+class ExtractionJobView(APIView):
+    """
+    API to poll the status and result of an asynchronous extraction job.
+    """
+    def get(self, request, job_id):
+        extraction_jobs.start()
+        job = extraction_jobs.get(job_id)
+        if not job:
+            return Response({"error": "Job not found"}, status=404)
+        return Response(_job_payload(job), status=200)
+
+
+class ExtractionJobEventsView(View):
+    """
+    Server-sent events stream of an extraction job's status, ending with its result.
+
+    Each open stream holds a gunicorn worker thread (4 workers x 2 threads in the
+    Dockerfile), so a stream lasts at most EXTRACTION_JOB_STREAM_SECONDS and then
+    closes with a "timeout" event; the ``retry:`` field tells EventSource clients
+    when to reconnect. Polling the job's status_url needs no long-lived thread.
+    """
+    def get(self, request, job_id):
+        extraction_jobs.start()
+        if not extraction_jobs.get(job_id):
+            return HttpResponse("Job not found", status=404)
+
+        response = StreamingHttpResponse(self._events(job_id), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"  # Stop proxies from buffering the stream
+        return response
+
+    def _events(self, job_id):
+        deadline = time.monotonic() + settings.EXTRACTION_JOB_STREAM_SECONDS
+        last_status = None
+        yield f"retry: {int(settings.EXTRACTION_JOB_POLL_SECONDS * 1000)}\n\n"
+        while time.monotonic() < deadline:
+            job = extraction_jobs.get(job_id)
+            if job is None:
+                yield _sse("error", {"job_id": job_id, "error": "Job not found"})
+                return
+            if job["status"] != last_status:
+                last_status = job["status"]
+                event = "status" if last_status in (QUEUED, RUNNING) else "result"
+                yield _sse(event, _job_payload(job))
+                if event == "result":
+                    return
+            else:
+                yield ": keep-alive\n\n"
+            time.sleep(settings.EXTRACTION_JOB_POLL_SECONDS)
+        yield _sse("timeout", {"job_id": job_id, "status": last_status})
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
@@ -19,7 +19,7 @@ const Dashboard = () => {
   const fetchResumes = async (userId) => {
     try {
       const response = await axios.get("http://172.17.3.79:8000/resume/retrieve/", {
-        params: { user_id: userId },
+        params: { user_id: userId, view: "summary" },
       });
       console.log("API Response:", response.data);
       setUserResumes(response.data);
@@ -139,7 +139,7 @@ const Dashboard = () => {
             {userResumes.length > 0 &&
               userResumes.map((resume) => {
                 const imageSrc = resume.image_id
-                  ? `http://172.17.3.79:8000/resume/image/${resume.image_id}`
+                  ? `http://172.17.3.79:8000/resume/image/${resume.image_id}?size=480`
                   : "https://via.placeholder.com/250";
 
                 return (